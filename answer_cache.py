@@ -0,0 +1,120 @@
+"""
+Кэш ответов для режима «Задать вопрос».
+
+Вопросы нормализуются, а похожие формулировки находятся по косинусной
+близости символьных триграмм — локально, без эмбеддингов из API.
+Триграммы похожи у вопросов с общим шаблоном («как будет кот» и «как будет
+кит»), поэтому дополнительно должны совпасть содержательные слова — всё,
+кроме слов шаблона. Записи вытесняются по TTL и LRU.
+"""
+import time
+import logging
+from collections import OrderedDict, defaultdict
+
+from text_utils import normalize_text, char_ngrams, cosine_similarity
+
+logger = logging.getLogger(__name__)
+
+# Слова, которые не меняют смысл вопроса. Отдельные буквы и «пожалуйста» сюда
+# не входят: ученики спрашивают именно про них («чем отличается і от и»)
+FILLER_WORDS = {"скажи", "скажите", "подскажи", "подскажите", "плиз", "вот"}
+
+# Слова шаблона вопроса: по ним вопросы похожи, но смысл задают остальные слова
+TEMPLATE_WORDS = {
+    "как", "будет", "сказать", "говорить", "говорят", "пишется", "произносится",
+    "по", "украински", "украинский", "украинском", "на", "это",
+    "что", "значит", "означает", "чем", "отличается", "отличаются", "разница", "между",
+    "какая", "какой", "когда", "почему", "использовать", "используется", "слово", "слова",
+}
+
+
+class AnswerCache:
+    """LRU + TTL кэш ответов с поиском почти одинаковых вопросов"""
+
+    def __init__(self, max_items: int = 500, ttl: float = 7 * 24 * 3600, threshold: float = 0.85):
+        self.max_items = max_items
+        self.ttl = ttl
+        self.threshold = threshold
+        self._entries = OrderedDict()  # нормализованный вопрос → (вектор, ответ, время, содержательные слова)
+        self._index = defaultdict(set)  # триграмма → нормализованные вопросы
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(question: str) -> str:
+        words = normalize_text(question).split()
+        return " ".join(word for word in words if word not in FILLER_WORDS)
+
+    @staticmethod
+    def content_words(key: str) -> frozenset:
+        """Слова нормализованного вопроса без слов шаблона"""
+        return frozenset(word for word in key.split() if word not in TEMPLATE_WORDS)
+
+    def get(self, question: str) -> str:
+        """Ответ на тот же или почти тот же вопрос, либо None"""
+        key = self.normalize(question)
+        if key:
+            match = self._lookup(key)
+            if match is not None:
+                self._entries.move_to_end(match)
+                self.hits += 1
+                return self._entries[match][1]
+        self.misses += 1
+        return None
+
+    def put(self, question: str, answer: str) -> None:
+        key = self.normalize(question)
+        if not key or not answer:
+            return
+        self._remove(key)
+        vector = char_ngrams(key)
+        self._entries[key] = (vector, answer, time.monotonic(), self.content_words(key))
+        for gram in vector:
+            self._index[gram].add(key)
+        while len(self._entries) > self.max_items:
+            self._remove(next(iter(self._entries)))
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "items": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def _lookup(self, key: str) -> str:
+        deadline = time.monotonic() - self.ttl
+        if key in self._entries:
+            if self._entries[key][2] >= deadline:
+                return key
+            self._remove(key)
+            return None
+
+        vector = char_ngrams(key)
+        content = self.content_words(key)
+        candidates = set()
+        for gram in vector:
+            candidates |= self._index.get(gram, set())
+
+        best_key, best_score = None, self.threshold
+        for candidate in candidates:
+            candidate_vector, _, created, candidate_content = self._entries[candidate]
+            # «кот»/«кит», «устал»/«устала» — разные вопросы при любой похожести шаблона
+            if created < deadline or candidate_content != content:
+                continue
+            score = cosine_similarity(vector, candidate_vector)
+            if score >= best_score:
+                best_key, best_score = candidate, score
+        return best_key
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for gram in entry[0]:
+            keys = self._index.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[gram]
@@ -0,0 +1,151 @@
+"""
+Кэш озвучки: LRU в памяти поверх файлов на диске.
+Ключ — хэш от (текст, голос, модель), поэтому одинаковые фразы
+озвучиваются через ElevenLabs только один раз, даже после перезапуска.
+
+Файлы лежат в версионированном бандле (<dir>/v<N>/) с manifest.json,
+который заполняет офлайн-команда `python bot.py prerender`.
+"""
+import os
+import json
+import hashlib
+import logging
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Меняется, когда меняется формат хранимого аудио — старые бандлы игнорируются
+BUNDLE_VERSION = 2
+
+
+class AudioCache:
+    """Двухуровневый кэш аудио: память (LRU) + диск"""
+
+    def __init__(self, directory: str, max_items: int = 256):
+        self.directory = Path(directory) / f"v{BUNDLE_VERSION}"
+        self.manifest_path = self.directory / "manifest.json"
+        self.max_items = max_items
+        self._memory = OrderedDict()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(text: str, voice_id: str, model: str) -> str:
+        """Контентный ключ для фразы"""
+        raw = "\x1f".join((text, voice_id, model)).encode("utf-8")
+        return hashlib.sha256(raw).hexdigest()
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / f"{key}.audio"
+
+    def contains(self, text: str, voice_id: str, model: str) -> bool:
+        """Есть ли аудио на диске (без чтения файла)"""
+        return self.path_for(self.make_key(text, voice_id, model)).exists()
+
+    def get(self, text: str, voice_id: str, model: str, remember: bool = True) -> bytes:
+        """Вернуть аудио из кэша или None; remember=False — прочитанное с диска не кладётся в память"""
+        key = self.make_key(text, voice_id, model)
+
+        audio = self._memory.get(key)
+        if audio is not None:
+            self._memory.move_to_end(key)
+            return audio
+
+        try:
+            audio = self.path_for(key).read_bytes()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.error(f"Audio cache read error: {e}")
+            return None
+
+        if remember:
+            self._remember(key, audio)
+        return audio
+
+    def put(self, text: str, voice_id: str, model: str, audio: bytes, remember: bool = True) -> None:
+        """Сохранить аудио на диск и (remember=True) в память"""
+        key = self.make_key(text, voice_id, model)
+        if remember:
+            self._remember(key, audio)
+
+        # Пишем атомарно, чтобы при падении не остался обрезанный файл
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(audio)
+            os.replace(tmp_path, self.path_for(key))
+        except OSError as e:
+            logger.error(f"Audio cache write error: {e}")
+
+    def read_manifest(self) -> dict:
+        """Прочитать manifest.json бандла"""
+        try:
+            manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.error(f"Audio manifest read error: {e}")
+            return {}
+        if manifest.get("version") != BUNDLE_VERSION:
+            return {}
+        return manifest.get("entries", {})
+
+    def write_manifest(self, entries: dict) -> None:
+        """Записать manifest.json и удалить файлы записей, которых больше нет в корпусе"""
+        for key in set(self.read_manifest()) - set(entries):
+            self._memory.pop(key, None)
+            try:
+                self.path_for(key).unlink()
+            except FileNotFoundError:
+                pass
+
+        manifest = {"version": BUNDLE_VERSION, "entries": entries}
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.manifest_path)
+
+    def _remember(self, key: str, audio: bytes) -> None:
+        self._memory[key] = audio
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+
+class VoiceFileIds:
+    """Telegram file_id уже загруженных голосовых, чтобы не загружать их повторно.
+
+    file_id привязан к токену бота, поэтому при ошибке отправки запись
+    нужно удалить через forget() и загрузить аудио заново.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._file_ids = {}
+        try:
+            self._file_ids = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.error(f"Voice file_id store read error: {e}")
+
+    def get(self, text: str, voice_id: str, model: str) -> str:
+        return self._file_ids.get(AudioCache.make_key(text, voice_id, model))
+
+    def set(self, text: str, voice_id: str, model: str, file_id: str) -> None:
+        self._file_ids[AudioCache.make_key(text, voice_id, model)] = file_id
+        self._save()
+
+    def forget(self, text: str, voice_id: str, model: str) -> None:
+        if self._file_ids.pop(AudioCache.make_key(text, voice_id, model), None):
+            self._save()
+
+    def _save(self) -> None:
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+                json.dump(self._file_ids, tmp_file)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Voice file_id store write error: {e}")
@@ -0,0 +1,72 @@
+"""
+Постобработка озвучки: MP3 от ElevenLabs → OGG/Opus, родной формат голосовых Telegram.
+
+ffmpeg срезает тишину в начале и в конце, выравнивает громкость (loudnorm)
+и кодирует моно Opus с низким битрейтом — файл в несколько раз меньше MP3.
+Каждое перекодирование — отдельный процесс ffmpeg, число одновременных
+ограничено. Без ffmpeg бот сразу запрашивает у ElevenLabs OGG/Opus и
+отправляет его как есть, без срезания тишины и выравнивания громкости.
+"""
+import shutil
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+FFMPEG_PATH = shutil.which("ffmpeg")
+
+# Тишина срезается с начала, затем (через areverse) с конца; громкость — под речь в мессенджере
+_TRIM_START = "silenceremove=start_periods=1:start_threshold=-50dB:start_silence=0.1"
+AUDIO_FILTERS = f"{_TRIM_START},areverse,{_TRIM_START},areverse,loudnorm=I=-16:TP=-1.5:LRA=11"
+
+
+class Transcoder:
+    """Перекодирование аудио в OGG/Opus через ffmpeg с ограничением параллельности"""
+
+    def __init__(self, concurrency: int = 2, bitrate: str = "32k", timeout: float = 30,
+                 ffmpeg: str = FFMPEG_PATH):
+        self.ffmpeg = ffmpeg
+        self.bitrate = bitrate
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(concurrency)
+        if ffmpeg is None:
+            logger.warning("ffmpeg not found, voice notes will be sent without silence trimming and loudnorm")
+
+    @property
+    def available(self) -> bool:
+        return self.ffmpeg is not None
+
+    async def to_voice(self, audio: bytes) -> bytes:
+        """OGG/Opus из исходного аудио; без ffmpeg — исходное аудио, при ошибке — None"""
+        if not self.available:
+            return audio
+
+        async with self._semaphore:
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    self.ffmpeg, "-hide_banner", "-loglevel", "error",
+                    "-i", "pipe:0",
+                    "-af", AUDIO_FILTERS,
+                    "-ac", "1", "-ar", "48000",
+                    "-c:a", "libopus", "-b:a", self.bitrate, "-application", "voip",
+                    "-f", "ogg", "pipe:1",
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE
+                )
+            except OSError as e:
+                logger.error(f"ffmpeg start error: {e}")
+                return None
+
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(audio), self.timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                logger.error(f"ffmpeg timed out after {self.timeout}s")
+                return None
+
+        if process.returncode != 0 or not stdout:
+            logger.error(f"ffmpeg failed ({process.returncode}): {stderr.decode(errors='replace').strip()}")
+            return None
+        return stdout
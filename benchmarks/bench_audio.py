@@ -0,0 +1,106 @@
+"""
+Озвучка: размер голосового и время до отправки для разных форматов.
+
+Варианты:
+  * mp3_22050_32 — прежний формат без ffmpeg (MP3 как есть);
+  * opus_48000_32 — нынешний формат без ffmpeg (OGG/Opus от ElevenLabs как есть);
+  * mp3_44100_64+ffmpeg — MP3 получше, перекодированный Transcoder в OGG/Opus
+    (только если установлен ffmpeg).
+Для каждой из --phrases неизменных фраз бота замеряются синтез, перекодирование,
+размер файла и, если заданы TELEGRAM_TOKEN и BENCH_CHAT_ID, загрузка через
+sendVoice. Ходит в сеть; без ELEVENLABS_API_KEY замер пропускается.
+
+    python benchmarks/bench_audio.py [--phrases 5] [--voice nicoletta]
+"""
+import io
+import os
+import time
+import asyncio
+import argparse
+
+from common import import_bot, percentile
+
+bot = import_bot()
+
+VARIANTS = [
+    ("mp3_22050_32", "mp3_22050_32", False),
+    ("opus_48000_32", "opus_48000_32", False),
+    ("mp3_44100_64+ffmpeg", "mp3_44100_64", True),
+]
+
+
+async def synthesize(text: str, voice_id: str, output_format: str) -> bytes:
+    audio = bot.elevenlabs_client.text_to_speech.convert(
+        voice_id, text=text, model_id=bot.ELEVENLABS_MODEL, output_format=output_format
+    )
+    return b"".join([chunk async for chunk in audio])
+
+
+async def bench_variant(name: str, output_format: str, transcode: bool, phrases: list,
+                        voice_id: str, telegram_bot, chat_id: str) -> None:
+    sizes, synth_times, transcode_times, send_times = [], [], [], []
+    for text in phrases:
+        started = time.perf_counter()
+        audio = await synthesize(text, voice_id, output_format)
+        synth_times.append(time.perf_counter() - started)
+
+        if transcode:
+            started = time.perf_counter()
+            audio = await bot.transcoder.to_voice(audio)
+            transcode_times.append(time.perf_counter() - started)
+            if audio is None:
+                print(f"  {name}: ffmpeg failed for «{text}»")
+                continue
+        sizes.append(len(audio))
+
+        if telegram_bot is not None:
+            started = time.perf_counter()
+            await telegram_bot.send_voice(
+                chat_id, voice=io.BytesIO(audio), caption=f"{name}: {text}", disable_notification=True
+            )
+            send_times.append(time.perf_counter() - started)
+
+    line = (f"  {name:<20} {sum(sizes) / max(len(sizes), 1) / 1024:6.1f} KiB/phrase"
+            f"  synth p50 {percentile(synth_times, 0.5):.2f}s")
+    if transcode_times:
+        line += f"  transcode p50 {percentile(transcode_times, 0.5):.2f}s"
+    if send_times:
+        line += f"  send p50 {percentile(send_times, 0.5):.2f}s  p95 {percentile(send_times, 0.95):.2f}s"
+    print(line)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--phrases", type=int, default=5)
+    parser.add_argument("--voice", default=bot.DEFAULT_VOICE, choices=list(bot.UKRAINIAN_VOICES))
+    args = parser.parse_args()
+
+    if not os.getenv("ELEVENLABS_API_KEY"):
+        print("skipped: ELEVENLABS_API_KEY is not set")
+        return
+
+    chat_id = os.getenv("BENCH_CHAT_ID")
+    telegram_bot = None
+    if chat_id and os.getenv("TELEGRAM_TOKEN"):
+        telegram_bot = bot.Application.builder().token(bot.TELEGRAM_TOKEN).build().bot
+        await telegram_bot.initialize()
+    else:
+        print("send time: skipped (set TELEGRAM_TOKEN and BENCH_CHAT_ID)")
+
+    phrases = bot.static_phrases()[:args.phrases]
+    voice_id = bot.UKRAINIAN_VOICES[args.voice]
+    print(f"{len(phrases)} phrases, voice {args.voice}")
+    try:
+        for name, output_format, transcode in VARIANTS:
+            if transcode and not bot.transcoder.available:
+                print(f"  {name:<20} skipped (ffmpeg not found)")
+                continue
+            await bench_variant(name, output_format, transcode, phrases, voice_id, telegram_bot, chat_id)
+    finally:
+        if telegram_bot is not None:
+            await telegram_bot.shutdown()
+        await bot.http_client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
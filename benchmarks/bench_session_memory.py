@@ -0,0 +1,96 @@
+"""
+Память на пользователя: UserSession против прежнего словаря из bot.py.
+
+Замер через tracemalloc для N пользователей в трёх состояниях:
+  * fresh — только что созданный пользователь;
+  * progress — пройдено 3 темы, есть счётчики;
+  * dialog — плюс 80 реплик диалога (история обрезается по бюджету токенов
+    со сворачиванием в резюме, в старом формате — последние 20 реплик, как было
+    в bot.py, поэтому здесь UserSession хранит больше контекста).
+Плюс размер сериализованного состояния (то, что пишется в базу).
+
+    python benchmarks/bench_session_memory.py [--users 100000]
+"""
+import json
+import argparse
+import tracemalloc
+
+from common import ROOT  # noqa: F401  (добавляет корень репозитория в sys.path)
+from session import UserSession, ROLE_USER, ROLE_ASSISTANT
+
+TOPICS = ["greetings", "cafe", "transport", "shopping", "emotions"]
+USER_LINE = "Привіт! Я сьогодні ходив у кафе і замовив каву з молоком."
+ASSISTANT_LINE = "Чудово! (Отлично!) Як тобі кава? (Как тебе кофе?) 💡 'кава' — женский род"
+
+
+def legacy_user(state: str) -> dict:
+    """Состояние пользователя в исходном формате bot.py"""
+    data = {
+        "completed_lessons": [],
+        "current_topic": None,
+        "phrase_index": 0,
+        "correct_answers": 0,
+        "total_answers": 0,
+        "streak": 0,
+        "last_activity": None,
+        "dialog_context": [],
+        "mode": None,
+        "voice": "nicoletta",
+    }
+    if state in ("progress", "dialog"):
+        data["completed_lessons"] = TOPICS[:3]
+        data.update(current_topic="shopping", phrase_index=2, correct_answers=17, total_answers=21, streak=4)
+    if state == "dialog":
+        for i in range(40):
+            data["dialog_context"].append({"role": "user", "content": f"{USER_LINE} ({i})"})
+            data["dialog_context"].append({"role": "assistant", "content": f"{ASSISTANT_LINE} ({i})"})
+            data["dialog_context"] = data["dialog_context"][-20:]
+    return data
+
+
+def session_user(state: str) -> UserSession:
+    session = UserSession("nicoletta")
+    if state in ("progress", "dialog"):
+        for idx in range(3):
+            session.mark_completed(idx)
+        session.current_topic, session.phrase_index = 3, 2
+        session.correct_answers, session.total_answers, session.streak = 17, 21, 4
+    if state == "dialog":
+        for i in range(40):
+            session.add_dialog_message(ROLE_USER, f"{USER_LINE} ({i})")
+            session.add_dialog_message(ROLE_ASSISTANT, f"{ASSISTANT_LINE} ({i})")
+    return session
+
+
+def measure(factory, state: str, users: int) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    items = [factory(state) for _ in range(users)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del items
+    return (after - before) / users
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(f"{'state':<10}{'dict, B/user':>14}{'UserSession, B/user':>22}"
+          f"{'dict JSON, B':>14}{'session JSON, B':>17}")
+    for state in ("fresh", "progress", "dialog"):
+        users = args.users if state != "dialog" else max(1, args.users // 10)
+        legacy = measure(legacy_user, state, users)
+        compact = measure(session_user, state, users)
+        legacy_json = len(json.dumps(legacy_user(state), ensure_ascii=False).encode())
+        compact_json = len(session_user(state).to_json().encode())
+        print(f"{state:<10}{legacy:>14.0f}{compact:>22.0f}{legacy_json:>14}{compact_json:>17}")
+
+    dialog = session_user("dialog")
+    print(f"dialog context kept: dict — 20 messages, UserSession — {len(dialog.dialog)} messages "
+          f"+ {len(dialog.summary)}-char summary (budget {UserSession.history_tokens} tokens)")
+
+
+if __name__ == "__main__":
+    main()
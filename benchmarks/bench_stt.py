@@ -0,0 +1,129 @@
+"""
+Распознавание речи: задержка и WER (доля ошибок в словах) по бэкендам.
+
+Клипы берутся из папки фикстур: рядом с каждым аудиофайлом (.ogg, .oga,
+.mp3, .wav, .m4a) лежит эталонный текст с тем же именем и расширением .txt:
+
+    benchmarks/fixtures/stt/privit.ogg
+    benchmarks/fixtures/stt/privit.txt   →  Привіт, як справи?
+
+Бэкенды: api — Whisper API (нужен OPENAI_API_KEY, ходит в сеть),
+local — faster-whisper на CPU (pip install faster-whisper). Если клипов нет
+или ни один бэкенд недоступен, замер пропускается. Клипы из фраз уроков
+готовит make_stt_fixtures.py.
+
+    python benchmarks/bench_stt.py [--fixtures benchmarks/fixtures/stt] [--backends api,local] [--repeat 1]
+"""
+import os
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from common import ROOT, percentile
+from config import SETTINGS
+from scheduler import AIScheduler
+from stt import WhisperAPIBackend, LocalWhisperBackend
+from text_utils import normalize_text, levenshtein
+
+AUDIO_EXTENSIONS = {".ogg", ".oga", ".mp3", ".wav", ".m4a"}
+DEFAULT_FIXTURES = ROOT / "benchmarks" / "fixtures" / "stt"
+
+load_dotenv(ROOT / ".env")
+
+
+def load_clips(folder: Path) -> list:
+    """[(путь к аудио, эталонный текст)] для клипов, у которых есть .txt"""
+    if not folder.is_dir():
+        return []
+    clips = []
+    for path in sorted(folder.iterdir()):
+        reference = path.with_suffix(".txt")
+        if path.suffix.lower() in AUDIO_EXTENSIONS and reference.exists():
+            clips.append((path, reference.read_text(encoding="utf-8").strip()))
+    return clips
+
+
+def word_errors(reference: str, hypothesis: str) -> tuple:
+    """(ошибок в словах, слов в эталоне) после той же нормализации, что и при проверке ответов"""
+    expected = normalize_text(reference).split()
+    heard = normalize_text(hypothesis).split()
+    return levenshtein(expected, heard), len(expected)
+
+
+def create_backend(name: str):
+    """Бэкенд по имени или None с причиной, почему он недоступен"""
+    if name == "api":
+        if not os.getenv("OPENAI_API_KEY"):
+            return None, "OPENAI_API_KEY не задан"
+        from openai import AsyncOpenAI
+        return WhisperAPIBackend(AsyncOpenAI(), AIScheduler(SETTINGS["provider_limits"])), None
+    if name == "local":
+        options = SETTINGS["local_stt"]
+        try:
+            return LocalWhisperBackend(
+                model_size=options["model"],
+                compute_type=options["compute_type"],
+                workers=options["workers"],
+                cpu_threads=options["cpu_threads"]
+            ), None
+        except ImportError:
+            return None, "faster-whisper не установлен"
+    return None, "неизвестный бэкенд"
+
+
+async def bench_backend(backend, clips: list, repeat: int) -> None:
+    started = time.perf_counter()
+    await backend.warm_up()
+    print(f"{backend.name}: warm-up {time.perf_counter() - started:.2f}s")
+
+    latencies = []
+    errors = words = 0
+    for _ in range(repeat):
+        for path, reference in clips:
+            started = time.perf_counter()
+            text = await backend.transcribe(path.read_bytes())
+            latencies.append(time.perf_counter() - started)
+            clip_errors, clip_words = word_errors(reference, text)
+            errors += clip_errors
+            words += clip_words
+            if clip_errors:
+                print(f"  {path.name}: «{text}» ≠ «{reference}»")
+
+    print(f"  {len(latencies)} clips  p50 {percentile(latencies, 0.5):.2f}s  "
+          f"p95 {percentile(latencies, 0.95):.2f}s  WER {errors / max(words, 1):.1%}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", type=Path, default=DEFAULT_FIXTURES)
+    parser.add_argument("--backends", default="api,local")
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    clips = load_clips(args.fixtures)
+    if not clips:
+        print(f"skipped: no clips with .txt references in {args.fixtures} "
+              f"(generate them: python benchmarks/make_stt_fixtures.py)")
+        return
+
+    print(f"{len(clips)} clips from {args.fixtures}")
+    ran = False
+    for name in args.backends.split(","):
+        backend, reason = create_backend(name.strip())
+        if backend is None:
+            print(f"{name}: skipped ({reason})")
+            continue
+        try:
+            await bench_backend(backend, clips, args.repeat)
+            ran = True
+        finally:
+            backend.close()
+    if not ran:
+        print("skipped: no STT backend available")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
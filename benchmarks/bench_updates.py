@@ -0,0 +1,91 @@
+"""
+Нагрузочный тест обработки апдейтов (PerUserUpdateProcessor).
+
+Обработчик — фейковый асинхронный «клиент AI» с фиксированной задержкой,
+так что сеть не нужна. Сценарии:
+  * many-users — N пользователей по M сообщений: пропускная способность
+    при concurrency=1 (как раньше) и при concurrency из настроек;
+  * burst — один пользователь шлёт сообщения пачкой, остальные по одному:
+    задержка «остальных» не должна зависеть от размера пачки.
+В каждом сценарии проверяется, что апдейты одного пользователя обработаны по порядку.
+
+    python benchmarks/bench_updates.py [--users 100] [--messages 3] [--latency 0.02]
+"""
+import time
+import asyncio
+import argparse
+from collections import defaultdict
+
+from common import import_bot, percentile
+
+bot = import_bot()
+Update = bot.Update
+
+
+def make_update(update_id: int, user_id: int) -> Update:
+    return Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": 0, "text": str(update_id),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "bench"},
+        },
+    }, None)
+
+
+async def run(updates: list, concurrency: int, latency: float) -> tuple:
+    """Прогнать апдейты через процессор; вернуть (секунды, задержки по user_id, порядок по user_id)"""
+    processor = bot.PerUserUpdateProcessor(concurrency)
+    seen = defaultdict(list)
+    latencies = defaultdict(list)
+
+    async def handler(update: Update, received: float) -> None:
+        await asyncio.sleep(latency)  # «запрос к GPT»
+        seen[update.effective_user.id].append(update.update_id)
+        latencies[update.effective_user.id].append(time.perf_counter() - received)
+
+    started = time.perf_counter()
+    # Как Application: по задаче на апдейт, в порядке поступления
+    tasks = [
+        asyncio.create_task(processor.process_update(update, handler(update, time.perf_counter())))
+        for update in updates
+    ]
+    await asyncio.gather(*tasks)
+    return time.perf_counter() - started, latencies, seen
+
+
+def check_order(seen: dict) -> None:
+    for user_id, ids in seen.items():
+        assert ids == sorted(ids), f"user {user_id}: updates out of order"
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--messages", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--burst", type=int, default=None, help="размер пачки (по умолчанию 2 × concurrency)")
+    args = parser.parse_args()
+    concurrency = bot.MAX_CONCURRENT_UPDATES
+
+    updates = [make_update(m * args.users + u, 1000 + u) for m in range(args.messages) for u in range(args.users)]
+    print(f"many-users: {args.users} users × {args.messages} messages, handler latency {args.latency}s")
+    for workers in (1, concurrency):
+        elapsed, _, seen = await run(updates, workers, args.latency)
+        check_order(seen)
+        print(f"  concurrency={workers:<4} {elapsed:6.2f}s  {len(updates) / elapsed:8.1f} updates/s")
+
+    burst = args.burst or 2 * concurrency
+    noisy = [make_update(i, 1) for i in range(burst)]
+    others = [make_update(burst + i, 2000 + i) for i in range(args.users)]
+    elapsed, latencies, seen = await run(noisy + others, concurrency, args.latency)
+    check_order(seen)
+    other_latencies = [value for user_id, values in latencies.items() if user_id != 1 for value in values]
+    print(f"burst: user 1 sends {burst} messages, then {args.users} users send one each")
+    print(f"  other users: p50 {percentile(other_latencies, 0.5):.3f}s  p95 {percentile(other_latencies, 0.95):.3f}s"
+          f"  (one-handler latency {args.latency}s); total {elapsed:.2f}s")
+    print("per-user order: ok")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,136 @@
+"""
+Пропускная способность процессов-обработчиков (BOT_WORKERS, workers.py).
+
+Диспетчер раскладывает апдейты по настоящему WorkerPool (spawn), а в каждом
+процессе run_worker кормит заглушку Application: апдейты идут через
+PerUserUpdateProcessor бота, обработчик тратит --cpu-ms процессорного
+времени (проверка ответа, сборка промпта) и ждёт --latency секунд
+(«запрос к GPT»). Сеть не нужна. Замер начинается, когда все процессы
+запущены, и заканчивается, когда обработан последний апдейт; порядок
+апдейтов каждого пользователя проверяется. Выигрыш от процессов виден,
+когда обработчик упирается в CPU и ядер больше одного.
+
+    python benchmarks/bench_workers.py [--workers 1,2,4] [--users 200] [--messages 5] [--cpu-ms 2] [--latency 0.05]
+"""
+import os
+import time
+import asyncio
+import argparse
+import functools
+import multiprocessing
+from collections import defaultdict
+
+from common import import_bot
+from workers import WorkerPool, run_worker
+
+# Импортируется и в каждом процессе-обработчике: spawn заново загружает этот модуль
+bot = import_bot()
+READY = "ready"
+
+
+class StubApplication:
+    """То, что run_worker использует от Application: update_queue, start/stop и обработка апдейтов"""
+
+    def __init__(self, index: int, results, cpu_seconds: float, latency: float):
+        self.index = index
+        self.results = results
+        self.cpu_seconds = cpu_seconds
+        self.latency = latency
+        self.bot = None
+        self.post_init = None
+        self.post_shutdown = None
+        self.update_queue = asyncio.Queue()
+        self._processor = bot.PerUserUpdateProcessor(bot.MAX_CONCURRENT_UPDATES)
+        self._tasks = set()
+        self._fetcher = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        pass
+
+    async def handle(self, update) -> None:
+        deadline = time.process_time() + self.cpu_seconds
+        while time.process_time() < deadline:
+            pass
+        await asyncio.sleep(self.latency)
+        self.results.put((update.effective_user.id, update.update_id))
+
+    async def _fetch_updates(self) -> None:
+        # Как Application: по задаче на апдейт, в порядке поступления
+        while True:
+            update = await self.update_queue.get()
+            task = asyncio.create_task(self._processor.process_update(update, self.handle(update)))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def start(self) -> None:
+        self._fetcher = asyncio.create_task(self._fetch_updates())
+        self.results.put((READY, self.index))
+
+    async def stop(self) -> None:
+        while not self.update_queue.empty() or self._tasks:
+            await asyncio.sleep(0.01)
+        self._fetcher.cancel()
+
+
+def worker_main(results, cpu_seconds: float, latency: float, index: int, updates_queue) -> None:
+    application = StubApplication(index, results, cpu_seconds, latency)
+    asyncio.run(run_worker(application, updates_queue))
+
+
+def make_update(update_id: int, user_id: int):
+    return bot.Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": 0, "text": str(update_id),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "bench"},
+        },
+    }, None)
+
+
+async def run(workers: int, updates: list, cpu_seconds: float, latency: float) -> float:
+    results = multiprocessing.get_context("spawn").Queue()
+    target = functools.partial(worker_main, results, cpu_seconds, latency)
+    pool = WorkerPool(workers, target)
+    pool.start()
+    for _ in range(workers):
+        await asyncio.to_thread(results.get)
+
+    started = time.perf_counter()
+    for update in updates:
+        await pool.forward(update, None)
+    seen = defaultdict(list)
+    for _ in updates:
+        user_id, update_id = await asyncio.to_thread(results.get)
+        seen[user_id].append(update_id)
+    elapsed = time.perf_counter() - started
+
+    await pool.stop()
+    for user_id, ids in seen.items():
+        assert ids == sorted(ids), f"user {user_id}: updates out of order"
+    return elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=5)
+    parser.add_argument("--cpu-ms", type=float, default=2)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    updates = [make_update(m * args.users + u, 1000 + u) for m in range(args.messages) for u in range(args.users)]
+    print(f"{args.users} users × {args.messages} messages, handler {args.cpu_ms}ms CPU + {args.latency}s wait, "
+          f"{os.cpu_count()} CPU cores (больше процессов, чем ядер, не ускоряет)")
+    for workers in (int(value) for value in args.workers.split(",")):
+        elapsed = await run(workers, updates, args.cpu_ms / 1000, args.latency)
+        print(f"  workers={workers:<3} {elapsed:6.2f}s  {len(updates) / elapsed:8.1f} updates/s")
+    print("per-user order: ok")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,28 @@
+"""
+Общее для бенчмарков: запуск из любой папки и импорт бота без следов в рабочей папке.
+"""
+import os
+import sys
+import tempfile
+import importlib
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def import_bot():
+    """Импортировать bot.py с базой и кэшем озвучки во временной папке"""
+    workdir = tempfile.mkdtemp(prefix="bot-bench-")
+    os.environ.setdefault("USER_DB_PATH", os.path.join(workdir, "bot_data.sqlite3"))
+    os.environ.setdefault("AUDIO_CACHE_DIR", os.path.join(workdir, "audio_cache"))
+    os.environ.setdefault("FEEDBACK_BANK_PATH", os.path.join(workdir, "feedback_bank.json"))
+    return importlib.import_module("bot")
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
@@ -0,0 +1,56 @@
+"""
+Фикстуры для bench_stt.py: фразы уроков (DISCOVERY_LESSONS), озвученные
+тем же путём, что и в боте (ElevenLabs → OGG/Opus), с текстом фразы в .txt
+рядом с каждым клипом. Уже готовые клипы не перезаписываются.
+
+Ходит в сеть, нужен ELEVENLABS_API_KEY.
+
+    python benchmarks/make_stt_fixtures.py [--out benchmarks/fixtures/stt] [--voices nicoletta,anton]
+"""
+import os
+import asyncio
+import argparse
+from pathlib import Path
+
+from common import import_bot
+from bench_stt import DEFAULT_FIXTURES
+
+bot = import_bot()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out", type=Path, default=DEFAULT_FIXTURES)
+    parser.add_argument("--voices", default=bot.DEFAULT_VOICE)
+    args = parser.parse_args()
+
+    if not os.getenv("ELEVENLABS_API_KEY"):
+        print("skipped: ELEVENLABS_API_KEY is not set")
+        return
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    created = failed = 0
+    try:
+        for voice in args.voices.split(","):
+            voice_id = bot.UKRAINIAN_VOICES[voice.strip()]
+            for topic_id, topic in bot.DISCOVERY_LESSONS.items():
+                for index, phrase in enumerate(topic["phrases"]):
+                    name = f"{topic_id}-{index:02d}-{voice.strip()}"
+                    if (args.out / f"{name}.txt").exists():
+                        continue
+                    speech = await bot.generate_speech_elevenlabs(phrase["ukrainian"], voice_id)
+                    if not speech.audio:
+                        failed += 1
+                        continue
+                    # in_variant=False — ffmpeg не справился, это исходный MP3
+                    extension = ".ogg" if speech.in_variant else ".mp3"
+                    (args.out / f"{name}{extension}").write_bytes(speech.audio)
+                    (args.out / f"{name}.txt").write_text(phrase["ukrainian"] + "\n", encoding="utf-8")
+                    created += 1
+    finally:
+        await bot.http_client.aclose()
+    print(f"{created} clips written to {args.out}, {failed} failed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
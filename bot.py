@@ -10,19 +10,47 @@ load_dotenv()
 
 import os
 import io
+import sys
 import json
+import re
 import random
+import asyncio
 import logging
 import tempfile
+import time
+import hashlib
 from pathlib import Path
 from datetime import datetime
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup
+from collections import namedtuple
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, Message
+from telegram.constants import MessageLimit
+from telegram.error import BadRequest, RetryAfter
 from telegram.ext import (
     Application, CommandHandler, MessageHandler, CallbackQueryHandler,
-    ContextTypes, filters, ConversationHandler
+    ContextTypes, filters, ConversationHandler, TypeHandler
 )
-from openai import OpenAI
-from elevenlabs.client import ElevenLabs
+from openai import AsyncOpenAI
+from elevenlabs.client import AsyncElevenLabs
+
+from config import GPT_MODEL, SETTINGS
+from audio_cache import AudioCache, VoiceFileIds
+from storage import SQLiteBackend, UserStore
+from session import UserSession, ROLE_USER, ROLE_ASSISTANT, NO_TOPIC
+from answer_cache import AnswerCache
+from grading import grade_translation, EXACT, NEAR, AMBIGUOUS
+from feedback_bank import FeedbackBank
+from scheduler import AIScheduler, INTERACTIVE, BACKGROUND, SPECULATIVE
+from http_pool import create_http_client, pool_stats, HTTP2_AVAILABLE
+from stt import STTRouter, WhisperAPIBackend, LocalWhisperBackend
+from pronunciation import score_pronunciation
+from text_utils import split_sentences, looks_ukrainian
+from metrics import span, timed, observe_tokens, observe_bytes, start_metrics_server, stats_summary
+from workers import WorkerPool, run_worker
+from persistence import SQLitePersistence
+from voice_delivery import VoiceDelivery
+from update_processor import PerUserUpdateProcessor
+from prefetch import Prefetcher
+from audio_processing import Transcoder
 
 # Настройка логирования
 logging.basicConfig(
@@ -36,9 +64,55 @@ TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN", "YOUR_TELEGRAM_TOKEN")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "YOUR_OPENAI_KEY")
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY", "YOUR_ELEVENLABS_KEY")
 
-# Инициализация клиентов
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
-elevenlabs_client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
+# Режим вебхука: включается, если задан WEBHOOK_URL (публичный https-адрес сервиса)
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+PORT = int(os.getenv("PORT", "8080"))
+# Telegram присылает секрет в заголовке X-Telegram-Bot-Api-Secret-Token, чужие запросы отбрасываются.
+# Без WEBHOOK_SECRET секрет выводится из токена — не меняется между перезапусками и деплоями
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or hashlib.sha256(TELEGRAM_TOKEN.encode()).hexdigest()[:32]
+MAX_CONCURRENT_UPDATES = int(os.getenv("MAX_CONCURRENT_UPDATES", SETTINGS["max_concurrent_updates"]))
+# Боту нужны только сообщения и нажатия кнопок — остальные апдейты Telegram не присылает
+ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY]
+# Число процессов-обработчиков: больше 1 — апдейты распределяются по процессам по user_id
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "1"))
+# Служебный чат (например, приватный канал с ботом), куда заранее загружается озвучка ради file_id
+PREFETCH_CHAT_ID = os.getenv("PREFETCH_CHAT_ID")
+# Эндпоинт метрик Prometheus: включается, если задан METRICS_PORT
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT") or 0)  # Пустое METRICS_PORT= в .env — выключено
+# Кому доступна команда /stats (user_id через запятую)
+ADMIN_IDS = {int(user_id) for user_id in os.getenv("ADMIN_IDS", "").split(",") if user_id.strip()}
+
+# Инициализация клиентов (асинхронные, чтобы не блокировать event loop)
+# OpenAI и ElevenLabs используют один пул keep-alive соединений
+http_client = create_http_client(SETTINGS["http"])
+openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=http_client)
+elevenlabs_client = AsyncElevenLabs(api_key=ELEVENLABS_API_KEY, httpx_client=http_client)
+
+# Все запросы к AI идут через планировщик: лимиты, приоритеты, склейка дублей
+ai_scheduler = AIScheduler(SETTINGS["provider_limits"])
+
+
+def create_stt_router() -> STTRouter:
+    """Распознавание речи: Whisper API и, если включён, локальный faster-whisper для коротких фраз"""
+    remote = WhisperAPIBackend(openai_client, ai_scheduler)
+    options = SETTINGS["local_stt"]
+    if not (options["enabled"] or os.getenv("LOCAL_STT") == "1"):
+        return STTRouter(remote)
+    try:
+        local = LocalWhisperBackend(
+            model_size=options["model"],
+            compute_type=options["compute_type"],
+            workers=options["workers"],
+            cpu_threads=options["cpu_threads"]
+        )
+    except ImportError:
+        logger.warning("Local STT enabled but faster-whisper is not installed, using Whisper API only")
+        return STTRouter(remote)
+    return STTRouter(remote, local, max_local_duration=options["max_duration"])
+
+
+stt_router = create_stt_router()
 
 # ElevenLabs голоса для украинского
 UKRAINIAN_VOICES = {
@@ -48,6 +122,26 @@ UKRAINIAN_VOICES = {
 }
 
 DEFAULT_VOICE = "nicoletta"  # По умолчанию Nicoletta
+ELEVENLABS_MODEL = "eleven_multilingual_v2"
+
+# Голосовые перекодируются в OGG/Opus, если установлен ffmpeg
+transcoder = Transcoder(
+    concurrency=SETTINGS["transcode_concurrency"],
+    bitrate=SETTINGS["voice_bitrate"]
+)
+# Для перекодирования запрашиваем MP3 получше, без ffmpeg — сразу OGG/Opus от ElevenLabs
+ELEVENLABS_FORMAT = "mp3_44100_64" if transcoder.available else "opus_48000_32"
+# Вариант озвучки в ключах кэша и file_id: модель + как получен отправляемый OGG
+# (перекодирован ffmpeg с обработкой звука или как есть от ElevenLabs)
+AUDIO_VARIANT = f"{ELEVENLABS_MODEL}/{'ogg' if transcoder.available else ELEVENLABS_FORMAT}"
+
+# Кэш озвучки для неизменных фраз (уроки, приветствия, приглашения)
+audio_cache = AudioCache(
+    os.getenv("AUDIO_CACHE_DIR", SETTINGS["audio_cache_dir"]),
+    max_items=SETTINGS["audio_cache_items"]
+)
+# file_id уже загруженных в Telegram голосовых для тех же фраз
+voice_file_ids = VoiceFileIds(audio_cache.directory / "file_ids.json")
 
 # Состояния для ConversationHandler
 CHOOSING, LESSON, DIALOG, TRANSLATE, QUESTION = range(5)
@@ -294,136 +388,506 @@ TRANSLATION_EXERCISES = [
     {"russian": "Что будем есть?", "ukrainian": "Що будемо їсти?", "hint": "їсти = есть"},
     {"russian": "Спокойной ночи!", "ukrainian": "На добраніч!", "hint": "добраніч - слитно"},
     {"russian": "Пожалуйста", "ukrainian": "Будь ласка", "hint": "буквально 'будь ласков'"},
-    {"russian": "Я устал", "ukrainian": "Я втомився", "hint": "втомитися = устать"},
+    {"russian": "Я устал", "ukrainian": "Я втомився", "hint": "втомитися = устать", "alternatives": ["Я втомилася"]},
     {"russian": "Это чудесно!", "ukrainian": "Це чудово!", "hint": "чудово = чудесно"},
     {"russian": "Мне нравится", "ukrainian": "Мені подобається", "hint": "подобається = нравится"},
     {"russian": "Доброе утро!", "ukrainian": "Добрий ранок!", "hint": "ранок = утро"},
 ]
 
-# Хранилище данных пользователей
-user_data = {}
+# Неизменные фразы, которые бот озвучивает в режимах
+DIALOG_GREETING = "Привіт! Як справи? Давай спілкуватися по-українськи!"
+QUESTION_INVITATION = "Яке у тебе питання про українську мову?"
+TRANSLATE_PROMPT = "Переклади на українську: {russian}"
+
+
+def static_phrases() -> list:
+    """Все неизменные тексты для озвучки: уроки, упражнения и фиксированные фразы"""
+    texts = [DIALOG_GREETING, QUESTION_INVITATION]
+    for topic in DISCOVERY_LESSONS.values():
+        texts.extend(phrase["ukrainian"] for phrase in topic["phrases"])
+    texts.extend(TRANSLATE_PROMPT.format(russian=ex["russian"]) for ex in TRANSLATION_EXERCISES)
+    return list(dict.fromkeys(texts))
+
+
+# Индексы тем для битовой маски пройденных тем.
+# Новые темы добавляем только в конец DISCOVERY_LESSONS, иначе сдвинется прогресс
+TOPIC_IDS = list(DISCOVERY_LESSONS)
+TOPIC_INDEX = {topic_id: idx for idx, topic_id in enumerate(TOPIC_IDS)}
+
+UserSession.history_tokens = SETTINGS["dialog_history_tokens"]
+UserSession.summary_tokens = SETTINGS["dialog_summary_tokens"]
+
+
+def new_user_data() -> UserSession:
+    """Состояние нового пользователя"""
+    return UserSession(DEFAULT_VOICE)
 
-def get_user_data(user_id: int) -> dict:
+
+# Хранилище данных пользователей: SQLite + кэш активных пользователей в памяти
+user_store = UserStore(
+    SQLiteBackend(os.getenv("USER_DB_PATH", SETTINGS["user_db_path"])),
+    new_user_data,
+    UserSession.to_json,
+    UserSession.from_json,
+    ttl=SETTINGS["user_cache_ttl"],
+    max_items=SETTINGS["user_cache_items"],
+    flush_interval=SETTINGS["user_flush_interval"]
+)
+
+
+def get_user_data(user_id: int) -> UserSession:
     """Получить или создать данные пользователя"""
-    if user_id not in user_data:
-        user_data[user_id] = {
-            "completed_lessons": [],
-            "current_topic": None,
-            "phrase_index": 0,
-            "correct_answers": 0,
-            "total_answers": 0,
-            "streak": 0,
-            "last_activity": None,
-            "dialog_context": [],
-            "mode": None,
-            "voice": DEFAULT_VOICE
-        }
-    return user_data[user_id]
+    user_info = user_store.get(user_id)
+    user_info.last_activity = time.time()
+    return user_info
+
+
+# Готовые отзывы на переводы (собираются `python bot.py build-feedback` и пополняются GPT)
+feedback_bank = FeedbackBank(os.getenv("FEEDBACK_BANK_PATH", SETTINGS["feedback_bank_path"]))
+
+# Кэш ответов на частые вопросы в режиме «Задать вопрос»
+answer_cache = AnswerCache(
+    max_items=SETTINGS["answer_cache_items"],
+    ttl=SETTINGS["answer_cache_ttl"],
+    threshold=SETTINGS["answer_cache_similarity"]
+)
+
+# Озвучка фраз и приветствий режимов отправляется в фоне, по одной задаче на чат
+voice_delivery = VoiceDelivery(SETTINGS["voice_workers"], SETTINGS["voice_queue_size"])
+
+# Озвучка следующей фразы урока готовится, пока пользователь читает текущую
+prefetcher = Prefetcher(SETTINGS["prefetch_workers"], SETTINGS["prefetch_max_pending"])
 
 
 # ============== ГОЛОСОВЫЕ ФУНКЦИИ С ELEVENLABS ==============
 
-async def generate_speech_elevenlabs(text: str, voice_id: str = None) -> bytes:
-    """Генерация голосового сообщения через ElevenLabs"""
+async def synthesize_speech(text: str, voice_id: str, stream: bool = False, priority: int = BACKGROUND) -> bytes:
+    """Сырое аудио от ElevenLabs в ELEVENLABS_FORMAT, без кэша и перекодирования. Ошибки не перехватываются.
+    
+    Одинаковые фразы, которые синтезируются одновременно, запрашиваются один раз.
+    """
+    synthesize = elevenlabs_client.text_to_speech.stream if stream else elevenlabs_client.text_to_speech.convert
+    
+    async def request() -> bytes:
+        async with span("elevenlabs", "stream" if stream else "convert"):
+            audio = synthesize(
+                voice_id,
+                text=text,
+                model_id=ELEVENLABS_MODEL,
+                output_format=ELEVENLABS_FORMAT
+            )
+            # Преобразуем в bytes
+            audio_bytes = b"".join([chunk async for chunk in audio])
+        observe_bytes("elevenlabs", len(audio_bytes))
+        return audio_bytes
+    
+    return await ai_scheduler.run(
+        "elevenlabs", request, priority=priority,
+        key=("tts", text, voice_id, ELEVENLABS_MODEL, ELEVENLABS_FORMAT)
+    )
+
+
+async def synthesize_chunk(text: str, voice_id: str) -> bytes:
+    """Кусок длинной озвучки: при ошибке — None, остальные куски всё равно прозвучат"""
+    try:
+        # Ответ собеседника пользователь ждёт прямо сейчас — раньше фоновой озвучки
+        return await synthesize_speech(text, voice_id, stream=True, priority=INTERACTIVE)
+    except Exception as e:
+        logger.error(f"ElevenLabs TTS chunk error: {e}")
+        return None
+
+
+# Озвучка фразы. in_variant=False — ffmpeg не справился и audio — исходный MP3:
+# отправить можно, но ни в кэш, ни в file_id под AUDIO_VARIANT он не попадает
+Speech = namedtuple("Speech", "audio in_variant")
+
+
+async def generate_speech_elevenlabs(text: str, voice_id: str = None, cache: bool = False,
+                                     stream: bool = False, priority: int = BACKGROUND,
+                                     remember: bool = True) -> Speech:
+    """Генерация голосового сообщения через ElevenLabs.
+    
+    cache=True — для неизменных фраз: повторная озвучка берётся из кэша.
+    remember=False — не держать аудио в памяти кэша, только на диске.
+    stream=True — потоковый эндпоинт: первые байты приходят раньше, чем
+    закончится синтез всей фразы.
+    """
     try:
         if voice_id is None:
             voice_id = UKRAINIAN_VOICES[DEFAULT_VOICE]
         
-        audio = elevenlabs_client.generate(
-            text=text,
-            voice=voice_id,
-            model="eleven_multilingual_v2"
-        )
+        if cache:
+            cached = audio_cache.get(text, voice_id, AUDIO_VARIANT, remember=remember)
+            if cached is not None:
+                return Speech(cached, True)
         
-        # Преобразуем в bytes
-        audio_bytes = b"".join(audio)
-        return audio_bytes
+        audio_bytes = await synthesize_speech(text, voice_id, stream=stream, priority=priority)
+        if not audio_bytes:
+            return Speech(None, False)
+        
+        voice_bytes = await transcode_voice(audio_bytes)
+        if voice_bytes is None:
+            return Speech(audio_bytes, False)
+        
+        if cache:
+            audio_cache.put(text, voice_id, AUDIO_VARIANT, voice_bytes, remember=remember)
+        return Speech(voice_bytes, True)
     except Exception as e:
         logger.error(f"ElevenLabs TTS error: {e}")
-        return None
+        return Speech(None, False)
+
+
+async def transcode_voice(audio: bytes) -> bytes:
+    """Перекодирование в голосовое с замером этапа (см. Transcoder.to_voice)"""
+    async with span("transcode"):
+        return await transcoder.to_voice(audio)
 
 
-async def transcribe_voice(file_path: str) -> str:
-    """Транскрипция голосового сообщения через OpenAI Whisper"""
+async def transcribe_voice(audio, duration: float = None) -> str:
+    """Транскрипция голосового сообщения (локально или через OpenAI Whisper).
+    
+    audio — байты OGG из памяти или путь к файлу на диске.
+    """
     try:
-        with open(file_path, "rb") as audio_file:
-            transcript = openai_client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                language="uk"
-            )
-        return transcript.text
+        if isinstance(audio, (bytes, bytearray)):
+            observe_bytes("stt", len(audio))
+        async with span("stt"):
+            return await stt_router.transcribe(audio, duration)
     except Exception as e:
         logger.error(f"Transcription error: {e}")
         return None
 
 
-async def send_voice_phrase(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str, voice_id: str = None) -> None:
-    """Отправить голосовое сообщение с украинской фразой"""
-    audio_data = await generate_speech_elevenlabs(text, voice_id)
-    if audio_data:
-        try:
-            await update.callback_query.message.reply_voice(
-                voice=io.BytesIO(audio_data),
-                caption=f"🔊 {text}"
-            )
-        except:
-            await update.message.reply_voice(
-                voice=io.BytesIO(audio_data),
-                caption=f"🔊 {text}"
+async def chat_completion(messages: list, max_tokens: int, **options) -> str:
+    """Запрос к GPT без блокировки event loop"""
+    async def request():
+        async with span("openai", "completion"):
+            response = await openai_client.chat.completions.create(
+                model=GPT_MODEL,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=SETTINGS["temperature"],
+                **options
             )
-    else:
-        await update.message.reply_text(
-            f"⚠️ Не удалось сгенерировать аудио для: {text}"
+        observe_tokens("openai", response.usage)
+        return response
+    
+    response = await ai_scheduler.run("openai", request, priority=INTERACTIVE)
+    return response.choices[0].message.content
+
+
+async def edit_stream_message(message: Message, text: str) -> None:
+    """Обновить сообщение со стримингом, не падая на лимитах Telegram"""
+    try:
+        await message.edit_text(text[:MessageLimit.MAX_TEXT_LENGTH])
+    except RetryAfter as e:
+        logger.warning(f"Telegram flood control on stream edit, retry in {e.retry_after}s")
+    except BadRequest as e:
+        if "not modified" not in str(e).lower():
+            raise
+
+
+async def stream_chat_reply(message: Message, messages: list, max_tokens: int, on_text=None) -> str:
+    """Ответ GPT стримингом: сначала заглушка, потом правки по мере прихода токенов.
+    
+    Правки не чаще раза в SETTINGS["stream_edit_interval"] секунд; пока предыдущая
+    правка в полёте, новые токены копятся и уходят следующей правкой.
+    on_text(text) вызывается с накопленным текстом после каждого фрагмента.
+    """
+    placeholder = await message.reply_text("✍️ ...")
+    text = ""
+    last_edit = 0.0
+    edit_task = None
+    
+    # Слот планировщика занят, пока стрим не дочитан
+    async def consume_stream() -> None:
+        async with span("openai", "stream"):
+            await read_stream()
+    
+    async def read_stream() -> None:
+        nonlocal text, last_edit, edit_task
+        stream = await openai_client.chat.completions.create(
+            model=GPT_MODEL,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=SETTINGS["temperature"],
+            stream=True,
+            # Последний фрагмент стрима придёт с расходом токенов
+            stream_options={"include_usage": True}
+        )
+        async for chunk in stream:
+            if chunk.usage is not None:
+                observe_tokens("openai", chunk.usage)
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            text += chunk.choices[0].delta.content
+            if on_text is not None:
+                on_text(text)
+            
+            now = time.monotonic()
+            if (now - last_edit >= SETTINGS["stream_edit_interval"]
+                    and (edit_task is None or edit_task.done())):
+                edit_task = asyncio.create_task(edit_stream_message(placeholder, text + " ▌"))
+                last_edit = now
+    
+    try:
+        await ai_scheduler.run("openai", consume_stream, priority=INTERACTIVE)
+    except Exception:
+        if not text:
+            try:
+                await placeholder.delete()
+            except Exception:
+                pass
+        raise
+    finally:
+        if edit_task is not None:
+            try:
+                await edit_task
+            except Exception as e:
+                logger.warning(f"Stream edit error: {e}")
+    
+    # Финальная правка: полный текст без курсора
+    for _ in range(2):
+        try:
+            await placeholder.edit_text(text[:MessageLimit.MAX_TEXT_LENGTH])
+            break
+        except RetryAfter as e:
+            await asyncio.sleep(e.retry_after)
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                raise
+            break
+    
+    return text
+
+
+async def reply_chat_completion(message: Message, messages: list, max_tokens: int, on_text=None) -> str:
+    """Получить ответ GPT и отправить его пользователю (стримингом, если включено)"""
+    if SETTINGS["stream_replies"]:
+        return await stream_chat_reply(message, messages, max_tokens, on_text)
+    
+    text = await chat_completion(messages, max_tokens)
+    if on_text is not None:
+        on_text(text)
+    await message.reply_text(text)
+    return text
+
+
+# Перевод в скобках, в том числе ещё не закрытый
+PARENTHESES_RE = re.compile(r"\([^)]*(?:\)|$)")
+
+
+def voice_chunks(text: str, complete: bool = True) -> list:
+    """Украинские части ответа для озвучки, разбитые на куски по предложениям.
+    
+    Переводы в скобках и пояснения на русском не озвучиваются. Пока ответ
+    стримится (complete=False), возвращаются только части, которые уже не
+    изменятся, — результат для начала ответа всегда начало результата для
+    всего ответа, так что куски можно отправлять в синтез по мере появления.
+    """
+    lines = text.split("\n")
+    chunks = []
+    budget = SETTINGS["tts_max_chars"]
+    for number, line in enumerate(lines):
+        if not complete and number == len(lines) - 1:
+            # Последняя строка ещё растёт: окончательно только то, что до последней "("
+            if "(" not in line:
+                break
+            line = line[:line.rfind("(")]
+        for segment in PARENTHESES_RE.split(line):
+            segment = segment.strip()
+            if segment.startswith("💡") or not looks_ukrainian(segment):
+                continue
+            for chunk in split_sentences(segment, SETTINGS["tts_chunk_chars"]):
+                if len(chunk) > budget:
+                    return chunks
+                budget -= len(chunk)
+                chunks.append(chunk)
+    return chunks
+
+
+async def reply_voice_cached(message: Message, text: str, voice_id: str, caption: str) -> bool:
+    """Отправить озвучку неизменной фразы, по возможности по уже известному file_id.
+    
+    Озвучку ждёт пользователь, поэтому синтез идёт раньше предзагрузки и пререндера.
+    """
+    if voice_id is None:
+        voice_id = UKRAINIAN_VOICES[DEFAULT_VOICE]
+    
+    file_id = voice_file_ids.get(text, voice_id, AUDIO_VARIANT)
+    if file_id:
+        try:
+            async with span("telegram", "voice_file_id"):
+                await message.reply_voice(voice=file_id, caption=caption)
+            return True
+        except BadRequest as e:
+            # file_id мог устареть (например, сменился токен бота) — загружаем заново
+            logger.warning(f"Cached voice file_id rejected: {e}")
+            voice_file_ids.forget(text, voice_id, AUDIO_VARIANT)
+    
+    # shield: если отправку отменят, синтез всё равно закончится и попадёт в кэш
+    speech = await asyncio.shield(generate_speech_elevenlabs(text, voice_id, cache=True, priority=INTERACTIVE))
+    if not speech.audio:
+        return False
+    
+    async with span("telegram", "voice_upload"):
+        sent = await message.reply_voice(voice=io.BytesIO(speech.audio), caption=caption)
+    observe_bytes("voice_upload", len(speech.audio))
+    if sent.voice and speech.in_variant:
+        voice_file_ids.set(text, voice_id, AUDIO_VARIANT, sent.voice.file_id)
+    return True
+
+
+def prefetch_phrase_audio(context: ContextTypes.DEFAULT_TYPE, user_info: UserSession, text: str, voice_id: str = None) -> None:
+    """Заранее синтезировать (и, если задан PREFETCH_CHAT_ID, загрузить) озвучку фразы.
+    
+    Аудио пишется только на диск — в памяти остаются лишь задачи в работе.
+    Если пользователь успел уйти в простой, озвучка не готовится.
+    """
+    if voice_id is None:
+        voice_id = UKRAINIAN_VOICES[DEFAULT_VOICE]
+    if voice_file_ids.get(text, voice_id, AUDIO_VARIANT):
+        return
+    if not PREFETCH_CHAT_ID and audio_cache.contains(text, voice_id, AUDIO_VARIANT):
+        return
+    
+    async def prefetch() -> None:
+        if time.time() - user_info.last_activity > SETTINGS["prefetch_idle_seconds"]:
+            return
+        # Ниже всего остального: пользователь может эту фразу и не открыть.
+        # remember=False — в памяти кэша заранее подготовленному аудио не место
+        speech = await generate_speech_elevenlabs(
+            text, voice_id, cache=True, remember=False, priority=SPECULATIVE
         )
+        if not speech.in_variant:
+            return
+        if PREFETCH_CHAT_ID:
+            async with span("telegram", "prefetch_upload"):
+                sent = await context.bot.send_voice(
+                    PREFETCH_CHAT_ID, voice=io.BytesIO(speech.audio), caption=text, disable_notification=True
+                )
+            observe_bytes("voice_upload", len(speech.audio))
+            if sent.voice:
+                voice_file_ids.set(text, voice_id, AUDIO_VARIANT, sent.voice.file_id)
+    
+    prefetcher.schedule(("tts", text, voice_id), prefetch)
+
+
+def next_lesson_phrase(user_info: UserSession, topic_id: str = None, phrase_idx: int = -1) -> dict:
+    """Фраза, которую пользователь, скорее всего, откроет следующей, или None.
+    
+    Следующая фраза темы, а после последней — первая фраза первой непройденной темы.
+    """
+    topic = DISCOVERY_LESSONS.get(topic_id)
+    if topic and phrase_idx + 1 < len(topic["phrases"]):
+        return topic["phrases"][phrase_idx + 1]
+    for next_id, next_topic in DISCOVERY_LESSONS.items():
+        if next_id != topic_id and not user_info.is_completed(TOPIC_INDEX[next_id]):
+            return next_topic["phrases"][0]
+    return None
+
+
+def send_voice_background(update: Update, text: str, voice_id: str, caption: str,
+                          failure_text: str = None) -> bool:
+    """Отправить озвучку фоновой задачей чата: обработчик не ждёт синтеза.
+    
+    Прежняя задача этого чата отменяется. False — очередь заполнена, озвучка пропущена.
+    """
+    message = update.effective_message
+    
+    async def deliver() -> None:
+        if not await reply_voice_cached(message, text, voice_id, caption) and failure_text:
+            await message.reply_text(failure_text)
+    
+    return voice_delivery.submit(update.effective_chat.id, deliver)
 
 
+def send_voice_phrase(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str, voice_id: str = None) -> None:
+    """Отправить голосовое сообщение с украинской фразой"""
+    send_voice_background(
+        update, text, voice_id, f"🔊 {text}",
+        failure_text=f"⚠️ Не удалось сгенерировать аудио для: {text}"
+    )
+
+
+async def download_and_transcribe(context: ContextTypes.DEFAULT_TYPE, voice) -> str:
+    """Скачать голосовое и распознать его.
+    
+    Обычные голосовые скачиваются в память и сразу уходят в Whisper;
+    через временный файл на диске идут только файлы крупнее порога.
+    """
+    async with span("telegram", "get_file"):
+        file = await context.bot.get_file(voice.file_id)
+    
+    if voice.file_size is not None and voice.file_size > SETTINGS["voice_in_memory_max_bytes"]:
+        with tempfile.NamedTemporaryFile(suffix=".ogg", delete=False) as tmp_file:
+            tmp_path = tmp_file.name
+        try:
+            async with span("telegram", "voice_download"):
+                await file.download_to_drive(tmp_path)
+            return await transcribe_voice(tmp_path, voice.duration)
+        finally:
+            os.unlink(tmp_path)
+    
+    async with span("telegram", "voice_download"):
+        audio = await file.download_as_bytearray()
+    return await transcribe_voice(audio, voice.duration)
+
+
+@timed("handler")
 async def handle_voice_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обработка голосового сообщения от пользователя"""
     user_id = update.effective_user.id
     user_info = get_user_data(user_id)
     
-    voice = update.message.voice
-    file = await context.bot.get_file(voice.file_id)
+    transcribed_text = await download_and_transcribe(context, update.message.voice)
     
-    with tempfile.NamedTemporaryFile(suffix=".ogg", delete=False) as tmp_file:
-        await file.download_to_drive(tmp_file.name)
-        tmp_path = tmp_file.name
-    
-    try:
-        transcribed_text = await transcribe_voice(tmp_path)
-        
-        if not transcribed_text:
-            await update.message.reply_text(
-                "😕 Не удалось распознать голосовое сообщение. Попробуй ещё раз!"
-            )
-            return user_info.get("mode", CHOOSING) or CHOOSING
-        
+    if not transcribed_text:
         await update.message.reply_text(
-            f"🎤 Я услышал: *{transcribed_text}*",
-            parse_mode='Markdown'
+            "😕 Не удалось распознать голосовое сообщение. Попробуй ещё раз!"
         )
-        
-        current_mode = user_info.get("mode")
-        
-        if current_mode == DIALOG:
-            return await process_dialog_message(update, context, transcribed_text, user_info)
-        elif current_mode == TRANSLATE:
-            return await process_translation_answer(update, context, transcribed_text)
-        else:
-            return await process_general_voice(update, context, transcribed_text)
-            
-    finally:
-        os.unlink(tmp_path)
+        return user_info.mode if user_info.mode >= 0 else CHOOSING
+    
+    await update.message.reply_text(
+        f"🎤 Я услышал: *{transcribed_text}*",
+        parse_mode='Markdown'
+    )
+    
+    current_mode = user_info.mode
+    
+    if current_mode == DIALOG:
+        return await process_dialog_message(update, context, transcribed_text, user_info)
+    elif current_mode == TRANSLATE:
+        return await process_translation_answer(update, context, transcribed_text)
+    elif current_mode == LESSON and user_info.current_topic != NO_TOPIC:
+        return await process_pronunciation(update, context, transcribed_text, user_info)
+    else:
+        return await process_general_voice(update, context, transcribed_text)
 
 
-async def process_dialog_message(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str, user_info: dict = None) -> int:
+async def send_voice_pieces(message: Message, pieces: asyncio.Queue) -> None:
+    """Отправлять озвученные куски отдельными голосовыми в порядке ответа, до None в очереди"""
+    caption = "🔊 Послушай произношение"
+    while True:
+        task = await pieces.get()
+        if task is None:
+            return
+        audio_data = await task
+        if not audio_data:
+            continue
+        async with span("telegram", "voice_upload"):
+            await message.reply_voice(voice=io.BytesIO(audio_data), caption=caption)
+        observe_bytes("voice_upload", len(audio_data))
+        caption = None
+
+
+async def process_dialog_message(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str, user_info: UserSession = None) -> int:
     """Обработка сообщения в режиме диалога"""
     user_id = update.effective_user.id
     if user_info is None:
         user_info = get_user_data(user_id)
     
-    user_info["dialog_context"].append({"role": "user", "content": text})
+    user_info.add_dialog_message(ROLE_USER, text)
     
     system_prompt = """Ты — дружелюбный учитель украинского языка для русскоговорящего ученика.
     
@@ -444,33 +908,57 @@ async def process_dialog_message(update: Update, context: ContextTypes.DEFAULT_T
 """
     
     messages = [{"role": "system", "content": system_prompt}]
-    messages.extend(user_info["dialog_context"][-10:])
+    if user_info.summary:
+        messages.append({
+            "role": "system",
+            "content": f"Краткое содержание начала диалога: {user_info.summary}"
+        })
+    messages.extend(user_info.dialog_messages())
+    
+    # Голосовой ответ синтезируется параллельно со стримингом текста:
+    # каждая законченная украинская часть сразу уходит в ElevenLabs,
+    # куски синтезируются одновременно и склеиваются в одно голосовое.
+    # Без ffmpeg куски приходят в OGG, который байтами не склеить, — тогда
+    # каждый кусок уходит отдельным голосовым по порядку, первый — как только готов
+    voice_id = UKRAINIAN_VOICES.get(user_info.voice) or UKRAINIAN_VOICES[DEFAULT_VOICE]
+    tts_tasks = []
+    pieces = asyncio.Queue()
+    sender = None if transcoder.available else asyncio.create_task(send_voice_pieces(update.message, pieces))
+    
+    def start_tts(text: str, complete: bool) -> None:
+        for chunk in voice_chunks(text, complete)[len(tts_tasks):]:
+            task = asyncio.create_task(synthesize_chunk(chunk, voice_id))
+            tts_tasks.append(task)
+            pieces.put_nowait(task)
     
     try:
-        response = openai_client.chat.completions.create(
-            model="gpt-4.1-mini",
-            messages=messages,
-            max_tokens=500,
-            temperature=0.7
+        assistant_message = await reply_chat_completion(
+            update.message, messages, SETTINGS["max_tokens_dialog"],
+            on_text=lambda text: start_tts(text, complete=False)
         )
+        user_info.add_dialog_message(ROLE_ASSISTANT, assistant_message)
         
-        assistant_message = response.choices[0].message.content
-        user_info["dialog_context"].append({"role": "assistant", "content": assistant_message})
-        
-        await update.message.reply_text(assistant_message)
-        
-        # Генерируем голосовой ответ
-        ukrainian_part = assistant_message.split("(")[0].strip() if "(" in assistant_message else assistant_message[:100]
-        if ukrainian_part and len(ukrainian_part) > 5:
-            voice_id = UKRAINIAN_VOICES.get(user_info.get("voice", DEFAULT_VOICE))
-            audio_data = await generate_speech_elevenlabs(ukrainian_part, voice_id)
+        start_tts(assistant_message, complete=True)
+        pieces.put_nowait(None)
+        if sender is not None:
+            await sender
+        elif tts_tasks:
+            # MP3-куски склеиваются как есть и перекодируются один раз
+            audio_data = b"".join(piece for piece in await asyncio.gather(*tts_tasks) if piece)
             if audio_data:
-                await update.message.reply_voice(
-                    voice=io.BytesIO(audio_data),
-                    caption="🔊 Послушай произношение"
-                )
+                audio_data = await transcode_voice(audio_data) or audio_data
+                async with span("telegram", "voice_upload"):
+                    await update.message.reply_voice(
+                        voice=io.BytesIO(audio_data),
+                        caption="🔊 Послушай произношение"
+                    )
+                observe_bytes("voice_upload", len(audio_data))
         
     except Exception as e:
+        for task in tts_tasks:
+            task.cancel()
+        if sender is not None:
+            sender.cancel()
         logger.error(f"OpenAI API error: {e}")
         await update.message.reply_text(
             "Извини, произошла ошибка. Попробуй ещё раз!"
@@ -479,18 +967,15 @@ async def process_dialog_message(update: Update, context: ContextTypes.DEFAULT_T
     return DIALOG
 
 
-async def process_translation_answer(update: Update, context: ContextTypes.DEFAULT_TYPE, user_answer: str) -> int:
-    """Проверить перевод пользователя"""
-    user_id = update.effective_user.id
-    user_info = get_user_data(user_id)
-    
-    exercise = context.user_data.get("current_exercise")
-    if not exercise:
-        await update.message.reply_text("Упражнение не найдено. Начни заново: /translate")
-        return TRANSLATE
-    
-    user_info["total_answers"] += 1
-    
+def templated_translation_feedback(grade, exercise: dict) -> str:
+    """Мгновенный отзыв для точных и почти точных ответов без обращения к GPT"""
+    if grade.verdict == EXACT:
+        return feedback_bank.correct_feedback(exercise) or f"Всё точно! 💡 Запомни: {exercise['hint']}"
+    return f"Почти идеально — только небольшая опечатка. Правильно пишется: *{grade.expected}*"
+
+
+async def llm_translation_feedback(exercise: dict, user_answer: str) -> tuple:
+    """Отзыв GPT для спорного ответа: (текст, правильно ли)"""
     system_prompt = f"""Ты — учитель украинского языка. Проверь ответ ученика.
 
 Правильный ответ: {exercise['ukrainian']}
@@ -502,35 +987,63 @@ async def process_translation_answer(update: Update, context: ContextTypes.DEFAU
 3. Если неправильно - покажи правильный ответ, объясни ошибку и дай подсказку
 4. Всегда будь дружелюбным и поддерживающим
 
+Первой строкой напиши только ВЕРНО или НЕВЕРНО, дальше — объяснение.
 Ответь на русском языке."""
     
+    reply = await chat_completion(
+        [{"role": "system", "content": system_prompt}],
+        SETTINGS["max_tokens_translation"]
+    )
+    
+    verdict, _, feedback = reply.partition("\n")
+    verdict = verdict.strip(" *.:").upper()
+    if verdict in ("ВЕРНО", "НЕВЕРНО"):
+        return feedback.strip(), verdict == "ВЕРНО"
+    # GPT не соблюл формат — считаем ответ неверным и показываем текст целиком
+    return reply, False
+
+
+async def process_translation_answer(update: Update, context: ContextTypes.DEFAULT_TYPE, user_answer: str) -> int:
+    """Проверить перевод пользователя"""
+    user_id = update.effective_user.id
+    user_info = get_user_data(user_id)
+    
+    exercise = context.user_data.get("current_exercise")
+    if not exercise:
+        await update.message.reply_text("Упражнение не найдено. Начни заново: /translate")
+        return TRANSLATE
+    
+    user_info.total_answers += 1
+    
+    # Однозначные случаи оцениваем локально, GPT — только спорные
+    grade = grade_translation(user_answer, exercise)
+    
     try:
-        response = openai_client.chat.completions.create(
-            model="gpt-4.1-mini",
-            messages=[{"role": "system", "content": system_prompt}],
-            max_tokens=300,
-            temperature=0.7
-        )
-        
-        feedback = response.choices[0].message.content
-        
-        # Проверяем правильность (простая проверка)
-        is_correct = user_answer.lower().strip() == exercise['ukrainian'].lower().strip()
+        banked = None if grade.is_correct else feedback_bank.lookup(exercise, user_answer)
+        if banked is not None:
+            feedback, is_correct = banked
+        elif grade.verdict == AMBIGUOUS:
+            feedback, is_correct = await llm_translation_feedback(exercise, user_answer)
+            # Сохраняем отзыв, чтобы похожий ответ в следующий раз не требовал GPT
+            if feedback_bank.add(exercise, user_answer, feedback, is_correct):
+                feedback_bank.save()
+        else:
+            feedback, is_correct = templated_translation_feedback(grade, exercise), grade.is_correct
         
         if is_correct:
-            user_info["correct_answers"] += 1
-            user_info["streak"] += 1
+            user_info.correct_answers += 1
+            user_info.streak += 1
             
             response_text = f"""
 ✅ *Правильно!* Молодец!
 
-🔥 Серия правильных ответов: {user_info["streak"]}
+🔥 Серия правильных ответов: {user_info.streak}
 
 {feedback}
 
 Напиши /translate для следующего упражнения."""
         else:
-            user_info["streak"] = 0
+            user_info.streak = 0
             response_text = f"""
 ❌ Не совсем правильно...
 
@@ -551,6 +1064,34 @@ async def process_translation_answer(update: Update, context: ContextTypes.DEFAU
     return TRANSLATE
 
 
+async def process_pronunciation(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str, user_info: UserSession) -> int:
+    """Оценка произношения текущей фразы урока (локально, без GPT)"""
+    topic = DISCOVERY_LESSONS[TOPIC_IDS[user_info.current_topic]]
+    phrase = topic["phrases"][min(user_info.phrase_index, len(topic["phrases"]) - 1)]
+    result = score_pronunciation(text, phrase)
+    
+    if result.score >= 90:
+        verdict = "Отлично! 🎉"
+    elif result.score >= 70:
+        verdict = "Хорошо, но есть что подтянуть 👍"
+    else:
+        verdict = "Попробуй ещё раз — послушай образец 🔊"
+    
+    lines = [f"🎯 *Произношение: {result.score}/100* — {verdict}", ""]
+    for word in result.words:
+        if word.score >= 0.85:
+            lines.append(f"✅ {word.expected}")
+            continue
+        heard = f"услышал «{word.heard}»" if word.heard else "не услышал"
+        stress = f", ударение: {word.stress}" if word.stress else ""
+        lines.append(f"⚠️ {word.expected} — {heard}{stress}")
+    lines.append("")
+    lines.append(f"🔊 *Ударения:* {phrase['audio_hint']}")
+    
+    await update.message.reply_text("\n".join(lines), parse_mode='Markdown')
+    return LESSON
+
+
 async def process_general_voice(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str) -> int:
     """Обработка голосового сообщения в других режимах"""
     await update.message.reply_text(
@@ -562,12 +1103,13 @@ async def process_general_voice(update: Update, context: ContextTypes.DEFAULT_TY
 
 # ============== КОМАНДЫ БОТА ==============
 
+@timed("handler")
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Начало работы с ботом"""
     user = update.effective_user
     user_id = user.id
     user_info = get_user_data(user_id)
-    user_info["mode"] = CHOOSING
+    user_info.mode = CHOOSING
     
     welcome_text = f"""
 🇺🇦 *Привет, {user.first_name}!*
@@ -608,15 +1150,16 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     return CHOOSING
 
 
+@timed("handler")
 async def show_topics(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Показать список тем для обучения"""
     user_id = update.effective_user.id
     user_info = get_user_data(user_id)
-    user_info["mode"] = LESSON
+    user_info.mode = LESSON
     
     keyboard = []
     for topic_id, topic in DISCOVERY_LESSONS.items():
-        status = "✅" if topic_id in user_info["completed_lessons"] else "⭕"
+        status = "✅" if user_info.is_completed(TOPIC_INDEX[topic_id]) else "⭕"
         keyboard.append([
             InlineKeyboardButton(
                 f"{status} {topic['title']}",
@@ -646,6 +1189,11 @@ async def show_topics(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
             parse_mode='Markdown'
         )
     
+    # Скорее всего, пользователь откроет первую непройденную тему
+    next_phrase = next_lesson_phrase(user_info)
+    if next_phrase:
+        prefetch_phrase_audio(context, user_info, next_phrase['ukrainian'], UKRAINIAN_VOICES.get(user_info.voice))
+    
     return LESSON
 
 
@@ -657,13 +1205,13 @@ async def show_phrase(update: Update, context: ContextTypes.DEFAULT_TYPE, topic_
     topic = DISCOVERY_LESSONS.get(topic_id)
     if not topic or phrase_idx >= len(topic["phrases"]):
         await update.callback_query.answer("Упражнение завершено!")
-        if topic_id not in user_info["completed_lessons"]:
-            user_info["completed_lessons"].append(topic_id)
+        if topic_id in TOPIC_INDEX:
+            user_info.mark_completed(TOPIC_INDEX[topic_id])
         return await show_topics(update, context)
     
     phrase = topic["phrases"][phrase_idx]
-    user_info["current_topic"] = topic_id
-    user_info["phrase_index"] = phrase_idx
+    user_info.current_topic = TOPIC_INDEX[topic_id]
+    user_info.phrase_index = phrase_idx
     
     text = f"""
 📖 *{topic['title']}*
@@ -676,6 +1224,8 @@ async def show_phrase(update: Update, context: ContextTypes.DEFAULT_TYPE, topic_
 📝 *Контекст:* {phrase['context']}
 
 🔊 *Произношение:* {phrase['audio_hint']}
+
+🎤 _Отправь голосовое с этой фразой — я оценю произношение_
 """
     
     # Кнопки навигации
@@ -703,19 +1253,25 @@ async def show_phrase(update: Update, context: ContextTypes.DEFAULT_TYPE, topic_
         parse_mode='Markdown'
     )
     
-    # Автоматически отправляем голосовое сообщение
-    voice_id = UKRAINIAN_VOICES.get(user_info.get("voice", DEFAULT_VOICE))
-    await send_voice_phrase(update, context, phrase['ukrainian'], voice_id)
+    # Голосовое догонит текст из фоновой задачи
+    voice_id = UKRAINIAN_VOICES.get(user_info.voice)
+    send_voice_phrase(update, context, phrase['ukrainian'], voice_id)
+    
+    # Пока пользователь читает, готовим озвучку следующей фразы
+    next_phrase = next_lesson_phrase(user_info, topic_id, phrase_idx)
+    if next_phrase:
+        prefetch_phrase_audio(context, user_info, next_phrase['ukrainian'], voice_id)
     
     return LESSON
 
 
+@timed("handler")
 async def start_dialog_mode(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Начать режим диалога"""
     user_id = update.effective_user.id
     user_info = get_user_data(user_id)
-    user_info["mode"] = DIALOG
-    user_info["dialog_context"] = []
+    user_info.mode = DIALOG
+    user_info.clear_dialog()
     
     text = """
 💬 *Режим диалога*
@@ -741,18 +1297,13 @@ _(Напиши /stop чтобы выйти из диалога)_
         await update.message.reply_text(text, parse_mode='Markdown')
     
     # Отправляем приветствие голосом
-    voice_id = UKRAINIAN_VOICES.get(user_info.get("voice", DEFAULT_VOICE))
-    greeting = "Привіт! Як справи? Давай спілкуватися по-українськи!"
-    audio_data = await generate_speech_elevenlabs(greeting, voice_id)
-    if audio_data:
-        await update.message.reply_voice(
-            voice=io.BytesIO(audio_data),
-            caption="🔊 Послушай приветствие"
-        )
+    voice_id = UKRAINIAN_VOICES.get(user_info.voice)
+    send_voice_background(update, DIALOG_GREETING, voice_id, "🔊 Послушай приветствие")
     
     return DIALOG
 
 
+@timed("handler")
 async def handle_dialog(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обработка текстовых сообщений в режиме диалога"""
     user_message = update.message.text
@@ -760,7 +1311,7 @@ async def handle_dialog(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     user_info = get_user_data(user_id)
     
     if user_message.lower() == '/stop':
-        user_info["mode"] = CHOOSING
+        user_info.mode = CHOOSING
         await update.message.reply_text(
             "Диалог завершён!\n\nИспользуй /start для главного меню."
         )
@@ -769,11 +1320,12 @@ async def handle_dialog(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     return await process_dialog_message(update, context, user_message, user_info)
 
 
+@timed("handler")
 async def start_translate_mode(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Начать упражнения на перевод"""
     user_id = update.effective_user.id
     user_info = get_user_data(user_id)
-    user_info["mode"] = TRANSLATE
+    user_info.mode = TRANSLATE
     
     exercise = random.choice(TRANSLATION_EXERCISES)
     context.user_data["current_exercise"] = exercise
@@ -798,29 +1350,26 @@ _(Напиши свой перевод или /skip чтобы пропусти
         await update.message.reply_text(text, parse_mode='Markdown')
     
     # Отправляем вопрос голосом
-    voice_id = UKRAINIAN_VOICES.get(user_info.get("voice", DEFAULT_VOICE))
-    question = f"Переклади на українську: {exercise['russian']}"
-    audio_data = await generate_speech_elevenlabs(question, voice_id)
-    if audio_data:
-        await update.message.reply_voice(
-            voice=io.BytesIO(audio_data),
-            caption="🔊 Послушай вопрос"
-        )
+    voice_id = UKRAINIAN_VOICES.get(user_info.voice)
+    question = TRANSLATE_PROMPT.format(russian=exercise["russian"])
+    send_voice_background(update, question, voice_id, "🔊 Послушай вопрос")
     
     return TRANSLATE
 
 
+@timed("handler")
 async def check_translation(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Проверить перевод пользователя (текстовый)"""
     user_answer = update.message.text.strip()
     return await process_translation_answer(update, context, user_answer)
 
 
+@timed("handler")
 async def ask_question_mode(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Режим вопросов об украинском языке"""
     user_id = update.effective_user.id
     user_info = get_user_data(user_id)
-    user_info["mode"] = QUESTION
+    user_info.mode = QUESTION
     
     text = """
 ❓ *Задай вопрос*
@@ -844,18 +1393,13 @@ _(Напиши /stop чтобы вернуться в меню)_
         await update.message.reply_text(text, parse_mode='Markdown')
     
     # Отправляем приглашение голосом
-    voice_id = UKRAINIAN_VOICES.get(user_info.get("voice", DEFAULT_VOICE))
-    invitation = "Яке у тебе питання про українську мову?"
-    audio_data = await generate_speech_elevenlabs(invitation, voice_id)
-    if audio_data:
-        await update.message.reply_voice(
-            voice=io.BytesIO(audio_data),
-            caption="🔊 Послушай вопрос"
-        )
+    voice_id = UKRAINIAN_VOICES.get(user_info.voice)
+    send_voice_background(update, QUESTION_INVITATION, voice_id, "🔊 Послушай вопрос")
     
     return QUESTION
 
 
+@timed("handler")
 async def handle_question(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обработка вопроса пользователя"""
     question = update.message.text
@@ -863,7 +1407,7 @@ async def handle_question(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     user_info = get_user_data(user_id)
     
     if question.lower() == '/stop':
-        user_info["mode"] = CHOOSING
+        user_info.mode = CHOOSING
         await update.message.reply_text(
             "Возвращаемся в меню. Используй /start"
         )
@@ -880,25 +1424,28 @@ async def handle_question(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 6. Если уместно, дай мнемонику для запоминания
 7. Если спрашивают как произносится — объясни подробно"""
     
-    try:
-        response = openai_client.chat.completions.create(
-            model="gpt-4.1-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": question}
-            ],
-            max_tokens=800,
-            temperature=0.7
-        )
-        
-        answer = response.choices[0].message.content
-        await update.message.reply_text(answer)
-        
-    except Exception as e:
-        logger.error(f"OpenAI API error: {e}")
-        await update.message.reply_text(
-            "Произошла ошибка при обработке вопроса. Попробуй ещё раз!"
-        )
+    cached_answer = answer_cache.get(question)
+    if cached_answer is not None:
+        stats = answer_cache.stats()
+        logger.info(f"Answer cache hit ({stats['hits']}/{stats['hits'] + stats['misses']})")
+        await update.message.reply_text(cached_answer)
+    else:
+        try:
+            answer = await reply_chat_completion(
+                update.message,
+                [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": question}
+                ],
+                SETTINGS["max_tokens_question"]
+            )
+            answer_cache.put(question, answer)
+            
+        except Exception as e:
+            logger.error(f"OpenAI API error: {e}")
+            await update.message.reply_text(
+                "Произошла ошибка при обработке вопроса. Попробуй ещё раз!"
+            )
     
     await update.message.reply_text(
         "\n_Есть ещё вопросы? Пиши! Или /stop для выхода._",
@@ -907,16 +1454,18 @@ async def handle_question(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     return QUESTION
 
 
+@timed("handler")
 async def show_progress(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Показать прогресс пользователя"""
     user_id = update.effective_user.id
     user_info = get_user_data(user_id)
     
     total_topics = len(DISCOVERY_LESSONS)
-    completed = len(user_info["completed_lessons"])
+    completed_topics = [TOPIC_IDS[idx] for idx in user_info.completed_indices() if idx < len(TOPIC_IDS)]
+    completed = len(completed_topics)
     
-    if user_info["total_answers"] > 0:
-        accuracy = (user_info["correct_answers"] / user_info["total_answers"]) * 100
+    if user_info.total_answers > 0:
+        accuracy = (user_info.correct_answers / user_info.total_answers) * 100
     else:
         accuracy = 0
     
@@ -924,18 +1473,18 @@ async def show_progress(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 📊 *Твой прогресс*
 
 📚 Темы: {completed}/{total_topics} пройдено
-✍️ Упражнения: {user_info["total_answers"]} выполнено
+✍️ Упражнения: {user_info.total_answers} выполнено
 ✅ Точность: {accuracy:.1f}%
-🔥 Текущая серия: {user_info["streak"]}
+🔥 Текущая серия: {user_info.streak}
 
 *Пройденные темы:*
 """
     
-    for topic_id in user_info["completed_lessons"]:
+    for topic_id in completed_topics:
         topic = DISCOVERY_LESSONS.get(topic_id, {})
         text += f"• {topic.get('title', topic_id)}\n"
     
-    if not user_info["completed_lessons"]:
+    if not completed_topics:
         text += "_Пока нет пройденных тем_\n"
     
     text += "\nПродолжай учиться! 💪"
@@ -943,10 +1492,31 @@ async def show_progress(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     await update.message.reply_text(text, parse_mode='Markdown')
 
 
+@timed("handler")
+async def show_stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Сводка метрик для администраторов (ADMIN_IDS)"""
+    if update.effective_user.id not in ADMIN_IDS:
+        return
+    
+    text = "\n".join([
+        "📈 Метрики",
+        "",
+        stats_summary(),
+        "",
+        f"Кэш ответов: {answer_cache.stats()}",
+        f"Озвучка: пропущено {voice_delivery.dropped}, упреждающая пропущена {prefetcher.skipped}",
+        f"HTTP-пул: {pool_stats(http_client)}",
+    ])
+    await update.message.reply_text(text[:MessageLimit.MAX_TEXT_LENGTH])
+
+
+@timed("handler")
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обработчик нажатий на кнопки"""
     query = update.callback_query
     await query.answer()
+    # Пользователь ушёл со страницы — недоставленная озвучка прежней страницы не нужна
+    voice_delivery.cancel(update.effective_chat.id)
     
     data = query.data
     user_id = update.effective_user.id
@@ -965,7 +1535,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return await ask_question_mode(update, context)
     
     elif data == "back_to_menu":
-        user_info["mode"] = CHOOSING
+        user_info.mode = CHOOSING
         keyboard = [
             [InlineKeyboardButton("📚 Начать урок", callback_data="start_lesson")],
             [InlineKeyboardButton("💬 Диалог с AI", callback_data="start_dialog")],
@@ -980,7 +1550,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     
     elif data.startswith("topic_"):
         topic_id = data.replace("topic_", "")
-        user_info["current_topic"] = topic_id
+        user_info.current_topic = TOPIC_INDEX.get(topic_id, NO_TOPIC)
         await show_phrase(update, context, topic_id, 0)
         return LESSON
     
@@ -999,18 +1569,19 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         topic = DISCOVERY_LESSONS.get(topic_id)
         if topic and phrase_idx < len(topic["phrases"]):
             phrase = topic["phrases"][phrase_idx]
-            voice_id = UKRAINIAN_VOICES.get(user_info.get("voice", DEFAULT_VOICE))
-            await send_voice_phrase(update, context, phrase["ukrainian"], voice_id)
+            voice_id = UKRAINIAN_VOICES.get(user_info.voice)
+            send_voice_phrase(update, context, phrase["ukrainian"], voice_id)
         return LESSON
     
     return CHOOSING
 
 
+@timed("handler")
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Отмена текущего действия"""
     user_id = update.effective_user.id
     user_info = get_user_data(user_id)
-    user_info["mode"] = CHOOSING
+    user_info.mode = CHOOSING
     
     await update.message.reply_text(
         "Действие отменено. Используй /start для начала."
@@ -1018,9 +1589,57 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     return ConversationHandler.END
 
 
-def main() -> None:
-    """Запуск бота"""
-    application = Application.builder().token(TELEGRAM_TOKEN).build()
+# Сервер эндпоинта метрик (запускается в post_init, если задан METRICS_PORT)
+metrics_server = None
+
+
+async def post_init(application: Application) -> None:
+    """Запуск фоновых задач после инициализации бота"""
+    global metrics_server
+    user_store.start()
+    voice_delivery.start()
+    prefetcher.start()
+    if METRICS_PORT:
+        metrics_server = await start_metrics_server(METRICS_HOST, METRICS_PORT)
+    application.create_task(stt_router.warm_up())
+
+
+async def post_shutdown(application: Application) -> None:
+    """Сохранение состояния перед остановкой"""
+    if metrics_server is not None:
+        metrics_server.close()
+        await metrics_server.wait_closed()
+    await voice_delivery.stop()
+    await prefetcher.stop()
+    await user_store.stop()
+    stt_router.close()
+    logger.info(f"HTTP pool stats: {pool_stats(http_client)}")
+    await http_client.aclose()
+
+
+def build_application(updater: bool = True) -> Application:
+    """Приложение бота со всеми обработчиками.
+    
+    updater=False — для процесса-обработчика: апдейты приходят от диспетчера, а не из Telegram.
+    """
+    builder = (
+        Application.builder()
+        .token(TELEGRAM_TOKEN)
+        .concurrent_updates(PerUserUpdateProcessor(MAX_CONCURRENT_UPDATES))
+        # Запросы к Telegram (включая скачивание файлов) — свой пул, настроенный под параллельные апдейты
+        .connection_pool_size(SETTINGS["telegram_pool_size"])
+        .http_version("2" if SETTINGS["http"]["http2"] and HTTP2_AVAILABLE else "1.1")
+        # Режимы и текущее упражнение переживают перезапуск — пользователю не нужно снова нажимать /start
+        .persistence(SQLitePersistence(
+            os.getenv("USER_DB_PATH", SETTINGS["user_db_path"]),
+            update_interval=SETTINGS["persistence_interval"]
+        ))
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+    )
+    if not updater:
+        builder = builder.updater(None)
+    application = builder.build()
     
     # Обработчик ошибок для Conflict ошибок
     async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -1062,15 +1681,149 @@ def main() -> None:
             ],
         },
         fallbacks=[CommandHandler("cancel", cancel), CommandHandler("start", start)],
+        name="main_conversation",
+        persistent=True,
     )
     
     application.add_handler(conv_handler)
     application.add_handler(CommandHandler("progress", show_progress))
+    application.add_handler(CommandHandler("stats", show_stats))
     application.add_error_handler(error_handler)
+    return application
+
+
+def run_application(application: Application) -> None:
+    """Получение апдейтов: вебхук, если задан WEBHOOK_URL, иначе long polling"""
+    if WEBHOOK_URL:
+        # Встроенный асинхронный сервер (tornado): Telegram сам доставляет апдейты.
+        # Реплика должна быть одна: сессии, состояние диалога и персистентность
+        # живут в памяти процесса, масштабирование — через BOT_WORKERS
+        logger.info(f"Бот запущен в режиме вебхука на порту {PORT}")
+        application.run_webhook(
+            listen="0.0.0.0",
+            port=PORT,
+            url_path=SETTINGS["webhook_path"],
+            webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{SETTINGS['webhook_path']}",
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=ALLOWED_UPDATES,
+            max_connections=SETTINGS["webhook_max_connections"]
+        )
+    else:
+        logger.info("Бот запущен!")
+        application.run_polling(allowed_updates=ALLOWED_UPDATES)
+
+
+def worker_main(index: int, updates_queue) -> None:
+    """Точка входа процесса-обработчика (запускается через spawn)"""
+    global METRICS_PORT
+    if METRICS_PORT:
+        # У каждого процесса свой порт метрик: METRICS_PORT + номер процесса
+        METRICS_PORT += index
+    logger.info(f"Bot worker {index} started")
+    asyncio.run(run_worker(build_application(updater=False), updates_queue))
+
+
+def run_sharded(count: int) -> None:
+    """Диспетчер: получает апдейты и раскладывает их по count процессам по user_id"""
+    pool = WorkerPool(count, worker_main, queue_size=SETTINGS["worker_queue_size"])
+
+    async def start_workers(application: Application) -> None:
+        pool.start()
+
+    async def stop_workers(application: Application) -> None:
+        await pool.stop()
+
+    # Диспетчер обрабатывает апдейты строго по одному — порядок внутри пользователя сохраняется
+    dispatcher = (
+        Application.builder()
+        .token(TELEGRAM_TOKEN)
+        .post_init(start_workers)
+        .post_shutdown(stop_workers)
+        .build()
+    )
+    dispatcher.add_handler(TypeHandler(Update, pool.forward))
+    run_application(dispatcher)
+
+
+def main() -> None:
+    """Запуск бота: один процесс или диспетчер с BOT_WORKERS процессами-обработчиками"""
+    if BOT_WORKERS > 1:
+        run_sharded(BOT_WORKERS)
+    else:
+        run_application(build_application())
+
+
+async def prerender_audio() -> None:
+    """Офлайн-озвучка всего статического корпуса всеми голосами в бандл кэша.
+    
+    Повторный запуск озвучивает только новые или изменённые фразы.
+    """
+    semaphore = asyncio.Semaphore(SETTINGS["prerender_concurrency"])
+    entries = {}
+    jobs = []
     
-    logger.info("Бот запущен!")
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    for voice_name, voice_id in UKRAINIAN_VOICES.items():
+        for text in static_phrases():
+            key = audio_cache.make_key(text, voice_id, AUDIO_VARIANT)
+            entries[key] = {
+                "text": text, "voice": voice_name, "voice_id": voice_id,
+                "model": ELEVENLABS_MODEL, "format": AUDIO_VARIANT.split("/")[-1]
+            }
+            if not audio_cache.contains(text, voice_id, AUDIO_VARIANT):
+                jobs.append((text, voice_id))
+    
+    async def render(text: str, voice_id: str) -> bool:
+        async with semaphore:
+            return (await generate_speech_elevenlabs(text, voice_id, cache=True)).in_variant
+    
+    logger.info(f"Prerender: {len(entries)} clips, {len(jobs)} to synthesize")
+    results = await asyncio.gather(*(render(text, voice_id) for text, voice_id in jobs))
+    failed = results.count(False)
+    
+    audio_cache.write_manifest(entries)
+    logger.info(f"Prerender done: {len(jobs) - failed} synthesized, {failed} failed")
+
+
+async def build_feedback_bank() -> None:
+    """Заполнить банк отзывов для упражнений, которых в нём ещё нет"""
+    for exercise in TRANSLATION_EXERCISES:
+        if feedback_bank.has_exercise(exercise):
+            continue
+        
+        prompt = f"""Ты — учитель украинского языка для русскоговорящих.
+Упражнение: перевести на украинский «{exercise['russian']}».
+Правильный ответ: {exercise['ukrainian']}
+
+Верни JSON вида:
+{{"correct": "короткое объяснение на русском, почему правильный ответ именно такой",
+  "mistakes": [{{"answer": "типичный неверный ответ", "feedback": "объяснение ошибки на русском"}}]}}
+Дай 5-8 самых частых ошибок русскоговорящих в этой фразе."""
+        
+        try:
+            reply = await chat_completion(
+                [{"role": "system", "content": prompt}],
+                SETTINGS["max_tokens_question"],
+                response_format={"type": "json_object"}
+            )
+            data = json.loads(reply)
+        except Exception as e:
+            logger.error(f"Feedback bank build error for '{exercise['russian']}': {e}")
+            continue
+        
+        feedback_bank.set_correct(exercise, data.get("correct") or "")
+        for mistake in data.get("mistakes", []):
+            answer = mistake.get("answer", "")
+            # GPT иногда приводит в «ошибках» правильные варианты — такие пропускаем
+            if answer and not grade_translation(answer, exercise).is_correct:
+                feedback_bank.add(exercise, answer, mistake.get("feedback", ""), False)
+        feedback_bank.save()
+        logger.info(f"Feedback bank: added '{exercise['russian']}'")
 
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == "prerender":
+        asyncio.run(prerender_audio())
+    elif len(sys.argv) > 1 and sys.argv[1] == "build-feedback":
+        asyncio.run(build_feedback_bank())
+    else:
+        main()
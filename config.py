@@ -14,10 +14,65 @@ GPT_MODEL = "gpt-4.1-mini"  # или "gpt-4.1-nano" для экономии
 
 # Настройки обучения
 SETTINGS = {
-    "max_dialog_history": 10,  # Сколько сообщений хранить в контексте диалога
+    "dialog_history_tokens": 1200,  # Бюджет токенов на историю диалога в контексте
+    "dialog_summary_tokens": 200,  # Бюджет токенов на резюме вытесненных реплик
     "max_tokens_dialog": 500,  # Максимум токенов в ответе диалога
     "max_tokens_question": 800,  # Максимум токенов в ответе на вопрос
+    "max_tokens_translation": 300,  # Максимум токенов в проверке перевода
     "temperature": 0.7,  # Креативность ответов (0-1)
+    "stream_replies": True,  # Показывать ответ GPT по мере генерации
+    "stream_edit_interval": 1.0,  # Минимальный интервал (сек) между правками сообщения
+    "max_concurrent_updates": 64,  # Сколько апдейтов обрабатывать параллельно (переопределяется MAX_CONCURRENT_UPDATES)
+    "webhook_path": "telegram",  # Путь вебхука на встроенном сервере
+    "webhook_max_connections": 40,  # Сколько соединений Telegram может открыть к вебхуку одновременно
+    "worker_queue_size": 1000,  # Очередь апдейтов каждого процесса-обработчика при BOT_WORKERS > 1
+    "audio_cache_dir": "audio_cache",  # Папка кэша озвучки (переопределяется AUDIO_CACHE_DIR)
+    "audio_cache_items": 256,  # Сколько аудио держать в памяти
+    "voice_workers": 8,  # Сколько озвучек отправлять в фоне одновременно
+    "voice_queue_size": 100,  # Сколько озвучек может ждать отправки; при переполнении озвучка пропускается
+    "tts_chunk_chars": 250,  # Длинный ответ озвучивается кусками не длиннее (символов), параллельно
+    "tts_max_chars": 1000,  # Сколько символов ответа в диалоге озвучивать максимум
+    "transcode_concurrency": 2,  # Сколько процессов ffmpeg перекодируют озвучку одновременно
+    "voice_bitrate": "32k",  # Битрейт Opus для голосовых
+    "prefetch_workers": 2,  # Сколько фраз урока озвучивать заранее одновременно
+    "prefetch_max_pending": 32,  # Предел очереди упреждающей озвучки (лишнее пропускается)
+    "prefetch_idle_seconds": 120,  # Не готовить озвучку для тех, кто неактивен дольше (сек)
+    "prerender_concurrency": 4,  # Параллельных запросов к ElevenLabs при `python bot.py prerender`
+    "user_db_path": "bot_data.sqlite3",  # Файл прогресса пользователей (переопределяется USER_DB_PATH)
+    "user_cache_ttl": 3600,  # Через сколько секунд неактивности выгружать пользователя из памяти
+    "user_cache_items": 10000,  # Максимум пользователей в памяти
+    "user_flush_interval": 5,  # Как часто (сек) записывать изменения пачкой
+    "persistence_interval": 5,  # Как часто (сек) сохранять состояние разговоров и user_data
+    "feedback_bank_path": "feedback_bank.json",  # Банк отзывов на переводы (переопределяется FEEDBACK_BANK_PATH)
+    # Лимиты исходящих запросов к AI: одновременных запросов, запросов в секунду, всплеск
+    "provider_limits": {
+        "openai": {"concurrency": 16, "rate": 8, "burst": 16},
+        "whisper": {"concurrency": 4, "rate": 2, "burst": 4},
+        "elevenlabs": {"concurrency": 4, "rate": 3, "burst": 6},
+    },
+    # Общий HTTP-пул для OpenAI и ElevenLabs
+    "http": {
+        "max_connections": 50,
+        "max_keepalive_connections": 20,
+        "keepalive_expiry": 120,  # Сколько секунд держать простаивающее соединение
+        "timeout": 60,
+        "connect_timeout": 10,
+        "http2": True,  # Нужен пакет h2 (httpx[http2])
+    },
+    "telegram_pool_size": 32,  # Соединений к Bot API (без учёта getUpdates)
+    "voice_in_memory_max_bytes": 10 * 1024 * 1024,  # Голосовые крупнее — через временный файл
+    # Локальное распознавание коротких голосовых (pip install faster-whisper)
+    "local_stt": {
+        "enabled": False,  # Или LOCAL_STT=1 в окружении
+        "model": "small",  # Размер модели faster-whisper
+        "compute_type": "int8",  # Квантование для CPU
+        "workers": 2,  # Параллельных распознаваний
+        "cpu_threads": 2,  # Потоков CPU на одно распознавание
+        "max_duration": 10,  # Голосовые не длиннее (сек) распознаются локально
+    },
+    "answer_cache_items": 500,  # Сколько ответов на вопросы хранить
+    "answer_cache_ttl": 7 * 24 * 3600,  # Время жизни ответа в кэше (сек)
+    "answer_cache_similarity": 0.85,  # Порог похожести вопросов (0-1)
 }
 
 # Проверка конфигурации
@@ -0,0 +1,100 @@
+"""
+Банк готовых объяснений для упражнений на перевод.
+
+Для каждого упражнения хранится объяснение правильного ответа и кластеры
+типичных ошибок: нормализованный ответ-представитель + объяснение. Банк
+заполняется командой `python bot.py build-feedback` и пополняется во время
+работы отзывами GPT, так что доля живых запросов к модели со временем падает.
+Похожий ответ получает отзыв кластера ошибки; вердикт «верно» переносится
+только на ответ с теми же окончаниями слов — «справа» вместо «справи»
+уже другая ошибка, а не тот же правильный ответ.
+"""
+import os
+import json
+import logging
+import tempfile
+from pathlib import Path
+
+from text_utils import normalize_text
+from grading import similarity, edits_keep_endings
+
+logger = logging.getLogger(__name__)
+
+
+class FeedbackBank:
+    """Готовые отзывы: упражнение → объяснение правильного ответа и кластеры ошибок"""
+
+    def __init__(self, path: str, threshold: float = 0.92, max_mistakes: int = 50):
+        self.path = Path(path)
+        self.threshold = threshold
+        self.max_mistakes = max_mistakes
+        self._data = {}
+        try:
+            self._data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.error(f"Feedback bank read error: {e}")
+
+    @staticmethod
+    def exercise_key(exercise: dict) -> str:
+        return normalize_text(exercise["russian"])
+
+    def _entry(self, exercise: dict) -> dict:
+        return self._data.setdefault(self.exercise_key(exercise), {"correct": None, "mistakes": []})
+
+    def has_exercise(self, exercise: dict) -> bool:
+        entry = self._data.get(self.exercise_key(exercise))
+        return bool(entry and entry["correct"])
+
+    def correct_feedback(self, exercise: dict) -> str:
+        """Объяснение правильного ответа или None"""
+        entry = self._data.get(self.exercise_key(exercise))
+        return entry["correct"] if entry else None
+
+    def lookup(self, exercise: dict, answer: str) -> tuple:
+        """Готовый отзыв на похожий ответ: (текст, правильно ли) или None"""
+        entry = self._data.get(self.exercise_key(exercise))
+        if not entry:
+            return None
+        mistake = self._closest(entry, normalize_text(answer))
+        if mistake is None:
+            return None
+        mistake["hits"] = mistake.get("hits", 0) + 1
+        return mistake["feedback"], mistake.get("is_correct", False)
+
+    def set_correct(self, exercise: dict, feedback: str) -> None:
+        self._entry(exercise)["correct"] = feedback
+
+    def add(self, exercise: dict, answer: str, feedback: str, is_correct: bool) -> bool:
+        """Добавить отзыв, если похожего ответа ещё нет. Возвращает True, если банк изменился"""
+        entry = self._entry(exercise)
+        normalized = normalize_text(answer)
+        if not normalized or not feedback or self._closest(entry, normalized) is not None:
+            return False
+        if len(entry["mistakes"]) >= self.max_mistakes:
+            # Вытесняем самый редко встречающийся кластер
+            entry["mistakes"].remove(min(entry["mistakes"], key=lambda m: m.get("hits", 0)))
+        entry["mistakes"].append({"answer": normalized, "feedback": feedback, "is_correct": is_correct, "hits": 0})
+        return True
+
+    def _closest(self, entry: dict, normalized: str) -> dict:
+        best, best_score = None, self.threshold
+        for mistake in entry["mistakes"]:
+            if mistake["answer"] == normalized:
+                return mistake
+            if mistake.get("is_correct") and not edits_keep_endings(normalized, mistake["answer"]):
+                continue
+            score = similarity(normalized, mistake["answer"])
+            if score >= best_score:
+                best, best_score = mistake, score
+        return best
+
+    def save(self) -> None:
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+                json.dump(self._data, tmp_file, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Feedback bank write error: {e}")
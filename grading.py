@@ -0,0 +1,103 @@
+"""
+Локальная проверка переводов.
+
+Ответ и эталон нормализуются (Unicode, апострофы, пунктуация), затем
+сравниваются по расстоянию Левенштейна и символьным n-граммам. Точные и
+почти точные совпадения оцениваются сразу, всё остальное решает GPT:
+непохожий на эталон ответ может оказаться синонимом («Прошу» вместо
+«Будь ласка»).
+"""
+from collections import namedtuple
+from itertools import product
+
+from text_utils import normalize_text, char_ngrams, cosine_similarity, levenshtein, levenshtein_ratio
+
+EXACT = "exact"  # совпадает с эталоном после нормализации
+NEAR = "near"  # опечатка в пару символов, окончания слов не тронуты
+AMBIGUOUS = "ambiguous"  # решает GPT (или банк отзывов)
+
+# Сколько последних букв слова считаем окончанием
+ENDING_LENGTH = 2
+# Слова короче — местоимения и предлоги («мене/мені», «в/у»): любая правка в них не опечатка
+MIN_TYPO_WORD_LENGTH = 4
+
+Grade = namedtuple("Grade", "verdict is_correct score expected")
+
+
+def expand_alternatives(text: str) -> list:
+    """Раскрыть варианты через слэш: "Я втомився/втомилася" → два ответа"""
+    options = [word.split("/") for word in text.split()]
+    return [" ".join(words) for words in product(*options)]
+
+
+def accepted_answers(exercise: dict) -> list:
+    """Все допустимые формы ответа на упражнение"""
+    answers = expand_alternatives(exercise["ukrainian"])
+    for alternative in exercise.get("alternatives", []):
+        answers.extend(expand_alternatives(alternative))
+    return answers
+
+
+def max_typos(text: str) -> int:
+    """Сколько опечаток прощаем в зависимости от длины ответа"""
+    return 1 if len(text) <= 12 else 2
+
+
+def has_russian_words(normalized_answer: str, expected: str, exercise: dict) -> bool:
+    """Есть ли в ответе слова из русского оригинала, которых нет в эталоне.
+
+    "Я дома" вместо "Я вдома" отличается на одну букву, но это не опечатка,
+    а ровно та ошибка, которую тренирует упражнение.
+    """
+    russian_words = set(normalize_text(exercise.get("russian", "")).split())
+    russian_words -= set(normalize_text(expected).split())
+    return any(word in russian_words for word in normalized_answer.split())
+
+
+def edits_keep_endings(normalized_answer: str, normalized_expected: str) -> bool:
+    """Можно ли считать расхождение опечаткой: слова те же, окончания не изменились.
+
+    В украинском правка в одну-две буквы на конце — обычно грамматическая
+    ошибка, которую и проверяет упражнение: «кава» вместо «каву» (падеж),
+    «мене» вместо «мені», «чудова» вместо «чудово».
+    """
+    answer_words = normalized_answer.split()
+    expected_words = normalized_expected.split()
+    if len(answer_words) != len(expected_words):
+        return False
+    for answer_word, expected_word in zip(answer_words, expected_words):
+        if answer_word == expected_word:
+            continue
+        if len(expected_word) < MIN_TYPO_WORD_LENGTH:
+            return False
+        if answer_word[-ENDING_LENGTH:] != expected_word[-ENDING_LENGTH:]:
+            return False
+    return True
+
+
+def similarity(a: str, b: str) -> float:
+    """Комбинированная похожесть нормализованных строк"""
+    return (levenshtein_ratio(a, b) + cosine_similarity(char_ngrams(a), char_ngrams(b))) / 2
+
+
+def grade_translation(answer: str, exercise: dict) -> Grade:
+    """Оценить перевод без обращения к API"""
+    normalized_answer = normalize_text(answer)
+
+    best_expected, best_score, best_distance = exercise["ukrainian"], -1.0, None
+    for expected in accepted_answers(exercise):
+        normalized_expected = normalize_text(expected)
+        if normalized_answer == normalized_expected:
+            return Grade(EXACT, True, 1.0, expected)
+        score = similarity(normalized_answer, normalized_expected)
+        if score > best_score:
+            best_expected, best_score = expected, score
+            best_distance = levenshtein(normalized_answer, normalized_expected)
+
+    normalized_best = normalize_text(best_expected)
+    if (best_distance is not None
+            and best_distance <= max_typos(normalized_best)
+            and edits_keep_endings(normalized_answer, normalized_best)
+            and not has_russian_words(normalized_answer, best_expected, exercise)):
+        return Grade(NEAR, True, best_score, best_expected)
+    return Grade(AMBIGUOUS, False, best_score, best_expected)
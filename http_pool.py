@@ -0,0 +1,71 @@
+"""
+Общий HTTP-клиент для OpenAI и ElevenLabs.
+
+Один пул keep-alive соединений (HTTP/2, если установлен h2) вместо
+отдельного транспорта у каждого SDK: повторные запросы не платят за
+TLS-рукопожатие. Хуки httpx считают запросы для метрик пула.
+"""
+import logging
+from collections import Counter
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class PoolMetrics:
+    """Счётчики запросов через общий пул"""
+
+    def __init__(self):
+        self.requests = Counter()  # хост → число запросов
+        self.errors = Counter()  # хост → число ответов 4xx/5xx
+
+    async def on_request(self, request: httpx.Request) -> None:
+        self.requests[request.url.host] += 1
+
+    async def on_response(self, response: httpx.Response) -> None:
+        if response.status_code >= 400:
+            self.errors[response.request.url.host] += 1
+
+
+def create_http_client(settings: dict) -> httpx.AsyncClient:
+    """Создать общий AsyncClient с настройками пула из SETTINGS["http"]"""
+    http2 = settings["http2"] and HTTP2_AVAILABLE
+    if settings["http2"] and not HTTP2_AVAILABLE:
+        logger.warning("HTTP/2 requested but h2 is not installed, using HTTP/1.1")
+
+    metrics = PoolMetrics()
+    client = httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=settings["max_connections"],
+            max_keepalive_connections=settings["max_keepalive_connections"],
+            keepalive_expiry=settings["keepalive_expiry"],
+        ),
+        timeout=httpx.Timeout(settings["timeout"], connect=settings["connect_timeout"]),
+        event_hooks={"request": [metrics.on_request], "response": [metrics.on_response]},
+    )
+    client.pool_metrics = metrics
+    return client
+
+
+def pool_stats(client: httpx.AsyncClient) -> dict:
+    """Снимок использования пула: открытые/простаивающие соединения и счётчики запросов"""
+    metrics = client.pool_metrics
+    stats = {
+        "requests": dict(metrics.requests),
+        "errors": dict(metrics.errors),
+    }
+    # Состояние соединений httpx публично не отдаёт — читаем пул httpcore, если он доступен
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None)
+    if connections is not None:
+        stats["connections"] = len(connections)
+        stats["idle_connections"] = sum(1 for conn in connections if conn.is_idle())
+    return stats
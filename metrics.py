@@ -0,0 +1,201 @@
+"""
+Метрики задержек по этапам: обработчики Telegram, GPT, Whisper, ElevenLabs,
+перекодирование и загрузка голосовых.
+
+span() замеряет длительность этапа и считает ошибки, observe_tokens() и
+observe_bytes() пишут объёмы. Всё хранится в памяти процесса и отдаётся
+в текстовом формате Prometheus встроенным HTTP-сервером (/metrics), а
+краткая сводка — командой /stats.
+"""
+import time
+import asyncio
+import logging
+import functools
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TOKEN_BUCKETS = (50, 100, 200, 500, 1000, 2000, 4000)
+BYTE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: tuple, extra: dict = None) -> str:
+    pairs = list(key) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _labels_key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_labels_key(labels), 0)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}  # метки → [счётчики по корзинам, сумма, количество]
+
+    def observe(self, value: float, **labels) -> None:
+        key = _labels_key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][index] += 1
+                break
+        series[1] += value
+        series[2] += 1
+
+    def items(self) -> list:
+        """[(метки, сумма, количество)] по всем сериям"""
+        return [(key, series[1], series[2]) for key, series in sorted(self._series.items())]
+
+    def quantile(self, q: float, key: tuple) -> float:
+        """Верхняя граница корзины, в которую попадает квантиль q"""
+        counts, _, total = self._series[key]
+        threshold = q * total
+        seen = 0
+        for bound, count in zip(self.buckets, counts):
+            seen += count
+            if seen >= threshold:
+                return bound
+        return float("inf")
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total_sum, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(key, {'le': bound})} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, {'le': '+Inf'})} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total_sum}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+stage_seconds = Histogram("bot_stage_seconds", "Latency of bot stages", LATENCY_BUCKETS)
+stage_errors = Counter("bot_stage_errors_total", "Failed bot stages")
+stage_tokens = Histogram("bot_stage_tokens", "Tokens used per call", TOKEN_BUCKETS)
+stage_bytes = Histogram("bot_stage_bytes", "Bytes transferred per call", BYTE_BUCKETS)
+METRICS = (stage_seconds, stage_errors, stage_tokens, stage_bytes)
+
+
+@asynccontextmanager
+async def span(stage: str, name: str = ""):
+    """Замер этапа: длительность в гистограмму, исключение — в счётчик ошибок"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        stage_errors.inc(stage=stage, name=name)
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        stage_seconds.observe(duration, stage=stage, name=name)
+        logger.debug(f"span stage={stage} name={name} duration_ms={duration * 1000:.1f}")
+
+
+def timed(stage: str):
+    """Декоратор: замер каждого вызова корутины как этапа stage с именем функции"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            async with span(stage, func.__name__):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def observe_tokens(stage: str, usage) -> None:
+    """Токены из usage ответа OpenAI (если провайдер их вернул)"""
+    if usage is None:
+        return
+    stage_tokens.observe(usage.prompt_tokens, stage=stage, kind="prompt")
+    stage_tokens.observe(usage.completion_tokens, stage=stage, kind="completion")
+
+
+def observe_bytes(stage: str, size: int) -> None:
+    stage_bytes.observe(size, stage=stage)
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def stats_summary() -> str:
+    """Сводка для /stats: по каждому этапу — число вызовов, среднее, p95 и ошибки"""
+    lines = []
+    for key, total_sum, count in stage_seconds.items():
+        labels = dict(key)
+        title = f"{labels['stage']}:{labels['name']}" if labels["name"] else labels["stage"]
+        errors = stage_errors.value(**labels)
+        p95 = stage_seconds.quantile(0.95, key)
+        lines.append(
+            f"{title} — {count} шт., ср. {total_sum / count:.2f}с, p95 ≤ {p95}с"
+            + (f", ошибок {errors:g}" if errors else "")
+        )
+    for metric, unit in ((stage_tokens, "ток."), (stage_bytes, "Б")):
+        for key, total_sum, count in metric.items():
+            labels = ", ".join(str(value) for _, value in key)
+            lines.append(f"{metric.name} [{labels}] — всего {total_sum:g} {unit}, ср. {total_sum / count:.0f}")
+    return "\n".join(lines) if lines else "Пока нет данных"
+
+
+async def _handle_request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), 5)
+        # Заголовки запроса не нужны — дочитываем до пустой строки
+        while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, body = "200 OK", render_metrics().encode()
+        else:
+            status, body = "404 Not Found", b"not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\n"
+            "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(host: str, port: int) -> asyncio.AbstractServer:
+    """Встроенный HTTP-сервер: GET /metrics в формате Prometheus"""
+    server = await asyncio.start_server(_handle_request, host, port)
+    logger.info(f"Metrics endpoint on http://{host}:{port}/metrics")
+    return server
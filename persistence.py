@@ -0,0 +1,157 @@
+"""
+Сохранение состояния ConversationHandler, user_data и chat_data между перезапусками.
+
+После деплоя пользователь остаётся в своём режиме (диалог, перевод, вопрос)
+и не должен заново нажимать /start. Application собирает изменения раз в
+update_interval; все изменения одного прохода пишутся в SQLite одной
+транзакцией в фоновом потоке, не блокируя event loop.
+Пишутся только изменённые ключи, поэтому несколько процессов-обработчиков
+(BOT_WORKERS) могут работать с одним файлом.
+"""
+import json
+import asyncio
+import logging
+import sqlite3
+import threading
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+logger = logging.getLogger(__name__)
+
+USER_DATA = "user_data"
+CHAT_DATA = "chat_data"
+
+
+def _conversation_kind(name: str) -> str:
+    return f"conversation:{name}"
+
+
+class SQLitePersistence(BasePersistence):
+    """Персистентность PTB поверх SQLite с отложенной пакетной записью"""
+
+    def __init__(self, path: str, update_interval: float = 5, flush_delay: float = 1.0):
+        # bot_data и callback_data бот не использует
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, callback_data=False),
+            update_interval=update_interval
+        )
+        self.flush_delay = flush_delay
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS persistence ("
+            "kind TEXT NOT NULL, key TEXT NOT NULL, data TEXT NOT NULL, "
+            "PRIMARY KEY (kind, key))"
+        )
+        self._conn.commit()
+        self._pending = {}  # (kind, key) → JSON или None (удалить)
+        self._flush_task = None
+
+    # --- Чтение при запуске ---
+
+    def _load_kind(self, kind: str) -> list:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT key, data FROM persistence WHERE kind = ?", (kind,)
+            ).fetchall()
+
+    async def _load_data(self, kind: str) -> dict:
+        rows = await asyncio.to_thread(self._load_kind, kind)
+        return {int(key): json.loads(data) for key, data in rows}
+
+    async def get_user_data(self) -> dict:
+        return await self._load_data(USER_DATA)
+
+    async def get_chat_data(self) -> dict:
+        return await self._load_data(CHAT_DATA)
+
+    async def get_bot_data(self) -> dict:
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name: str) -> dict:
+        rows = await asyncio.to_thread(self._load_kind, _conversation_kind(name))
+        return {tuple(json.loads(key)): json.loads(state) for key, state in rows}
+
+    # --- Запись изменений ---
+
+    def _schedule(self, kind: str, key: str, value) -> None:
+        """Запомнить изменение; все изменения за flush_delay уйдут одной транзакцией"""
+        try:
+            self._pending[(kind, key)] = None if value is None else json.dumps(value, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            logger.error(f"Persistence: cannot serialize {kind}/{key}: {e}")
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_delay)
+        await self._write_pending()
+
+    async def _write_pending(self) -> None:
+        if not self._pending:
+            return
+        items, self._pending = self._pending, {}
+        try:
+            await asyncio.to_thread(self._write, items)
+        except sqlite3.Error as e:
+            logger.error(f"Persistence write error: {e}")
+            # Вернуть несохранённое, не затирая более свежие изменения
+            for key, value in items.items():
+                self._pending.setdefault(key, value)
+
+    def _write(self, items: dict) -> None:
+        upserts = [(kind, key, data) for (kind, key), data in items.items() if data is not None]
+        deletes = [(kind, key) for (kind, key), data in items.items() if data is None]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO persistence (kind, key, data) VALUES (?, ?, ?) "
+                "ON CONFLICT(kind, key) DO UPDATE SET data = excluded.data",
+                upserts
+            )
+            self._conn.executemany("DELETE FROM persistence WHERE kind = ? AND key = ?", deletes)
+            self._conn.commit()
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        self._schedule(USER_DATA, str(user_id), data)
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        self._schedule(CHAT_DATA, str(chat_id), data)
+
+    async def update_bot_data(self, data) -> None:
+        pass
+
+    async def update_callback_data(self, data) -> None:
+        pass
+
+    async def update_conversation(self, name: str, key: tuple, new_state) -> None:
+        # None — разговор завершён, запись удаляется
+        self._schedule(_conversation_kind(name), json.dumps(list(key)), new_state)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._schedule(USER_DATA, str(user_id), None)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._schedule(CHAT_DATA, str(chat_id), None)
+
+    # Данные читаются один раз при запуске — между апдейтами обновлять нечего
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data) -> None:
+        pass
+
+    async def flush(self) -> None:
+        """Остановка приложения: дописать всё несохранённое и закрыть базу"""
+        if self._flush_task is not None and not self._flush_task.done():
+            await self._flush_task
+        await self._write_pending()
+        with self._lock:
+            self._conn.close()
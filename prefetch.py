@@ -0,0 +1,55 @@
+"""
+Упреждающая подготовка озвучки.
+
+Навигация по уроку предсказуема: после фразы почти всегда нажимают «Далее».
+Пока пользователь читает текущую фразу, озвучка следующей синтезируется в
+фоне с низким приоритетом. Очередь ограничена, одна и та же работа не
+ставится дважды; лишние задачи просто пропускаются.
+"""
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    """Ограниченная очередь фоновых задач с пропуском дублей по ключу"""
+
+    def __init__(self, workers: int = 2, max_pending: int = 32):
+        self.workers = workers
+        self._queue = asyncio.Queue(max_pending)
+        self._keys = set()  # ключи задач в очереди и в работе
+        self._worker_tasks = []
+        self.skipped = 0
+
+    def start(self) -> None:
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    def schedule(self, key, factory) -> bool:
+        """Поставить factory() в очередь, если такой задачи ещё нет и есть место"""
+        if key in self._keys:
+            return False
+        try:
+            self._queue.put_nowait((key, factory))
+        except asyncio.QueueFull:
+            self.skipped += 1
+            return False
+        self._keys.add(key)
+        return True
+
+    async def _worker(self) -> None:
+        while True:
+            key, factory = await self._queue.get()
+            try:
+                await factory()
+            except Exception as e:
+                logger.error(f"Prefetch error for {key}: {e}")
+            finally:
+                self._keys.discard(key)
+                self._queue.task_done()
@@ -0,0 +1,181 @@
+"""
+Локальная оценка произношения фраз из уроков.
+
+Эталонная фраза и распознанный текст переводятся в приблизительную
+фонемную запись (украинская орфография почти фонетична), слова
+выравниваются динамическим программированием, а каждое слово получает
+оценку по расстоянию Левенштейна между фонемами. Ударения берутся из
+audio_hint урока: слог, набранный заглавными, — ударный. Числа с обеих
+сторон записываются словами: в уроке «номер 5», а Whisper пишет «п'ять».
+"""
+import re
+from collections import namedtuple
+
+from text_utils import normalize_text, levenshtein_ratio
+
+# Буквы, которые дают два звука или звучат иначе, чем пишутся
+_DIGRAPHS = {
+    "я": ["й", "а"], "ю": ["й", "у"], "є": ["й", "е"], "ї": ["й", "і"],
+    "щ": ["ш", "ч"],
+    # Русские буквы, которые может вернуть распознавание
+    "ы": ["и"], "э": ["е"], "ё": ["й", "о"],
+}
+# Не дают отдельного звука
+_SILENT = {"ь", "'"}
+
+_NUMBER_RE = re.compile(r"\d+")
+_UNITS = ["нуль", "один", "два", "три", "чотири", "п'ять", "шість", "сім", "вісім", "дев'ять"]
+_TEENS = ["десять", "одинадцять", "дванадцять", "тринадцять", "чотирнадцять",
+          "п'ятнадцять", "шістнадцять", "сімнадцять", "вісімнадцять", "дев'ятнадцять"]
+_TENS = ["", "", "двадцять", "тридцять", "сорок", "п'ятдесят",
+         "шістдесят", "сімдесят", "вісімдесят", "дев'яносто"]
+_HUNDREDS = ["", "сто", "двісті", "триста", "чотириста", "п'ятсот",
+             "шістсот", "сімсот", "вісімсот", "дев'ятсот"]
+
+WordScore = namedtuple("WordScore", "expected heard score stress")
+PronunciationResult = namedtuple("PronunciationResult", "score words")
+
+
+def _below_thousand(number: int, feminine: bool = False) -> list:
+    words = []
+    hundreds, rest = divmod(number, 100)
+    if hundreds:
+        words.append(_HUNDREDS[hundreds])
+    tens, units = divmod(rest, 10)
+    if tens == 1:
+        words.append(_TEENS[units])
+        return words
+    if tens:
+        words.append(_TENS[tens])
+    if units:
+        words.append({1: "одна", 2: "дві"}.get(units, _UNITS[units]) if feminine else _UNITS[units])
+    return words
+
+
+def number_to_words(number: int) -> str:
+    """Количественное числительное словами: 5 → "п'ять", 2024 → "дві тисячі двадцять чотири".
+
+    Числа от миллиона и больше возвращаются цифрами — в уроках таких нет.
+    """
+    if number == 0:
+        return _UNITS[0]
+    if number >= 1_000_000:
+        return str(number)
+    thousands, rest = divmod(number, 1000)
+    words = []
+    if thousands:
+        if thousands % 100 // 10 != 1 and thousands % 10 == 1:
+            form = "тисяча"
+        elif thousands % 100 // 10 != 1 and 2 <= thousands % 10 <= 4:
+            form = "тисячі"
+        else:
+            form = "тисяч"
+        # «тисяча», а не «одна тисяча»
+        if thousands > 1:
+            words.extend(_below_thousand(thousands, feminine=True))
+        words.append(form)
+    words.extend(_below_thousand(rest))
+    return " ".join(words)
+
+
+def spell_numbers(text: str) -> str:
+    """Заменить числа в тексте словами, чтобы «5» и «п'ять» сравнивались как одно слово"""
+    return _NUMBER_RE.sub(lambda match: number_to_words(int(match.group())), text)
+
+
+def to_phonemes(word: str) -> list:
+    """Приблизительная фонемная запись нормализованного слова"""
+    phonemes = []
+    for letter in word:
+        if letter in _SILENT:
+            continue
+        phonemes.extend(_DIGRAPHS.get(letter, [letter]))
+    return phonemes
+
+
+def stress_hints(audio_hint: str) -> list:
+    """Слова подсказки с ударением: "ДОБ-рий РА-нок" → ["ДОБ-рий", "РА-нок"]"""
+    audio_hint = re.sub(r"\(.*?\)", " ", audio_hint)
+    words = re.findall(r"[\w'’-]+", audio_hint)
+    return [word for word in words if any(ch.isalpha() for ch in word)]
+
+
+def _word_similarity(a: list, b: list) -> float:
+    return levenshtein_ratio(a, b)
+
+
+def _stress_for(word: str, hints: list) -> str:
+    """Подсказка с ударением для слова (в подсказках бывают пропущены слова)"""
+    best, best_score = None, 0.6
+    for hint in hints:
+        score = levenshtein_ratio(word, normalize_text(hint.replace("-", "")))
+        if score >= best_score:
+            best, best_score = hint, score
+    return best
+
+
+def align_words(expected: list, heard: list) -> list:
+    """Выравнивание слов: для каждого ожидаемого слова — индекс услышанного или None"""
+    n, m = len(expected), len(heard)
+    # cost[i][j] — цена выравнивания первых i ожидаемых и j услышанных слов
+    cost = [[0.0] * (m + 1) for _ in range(n + 1)]
+    for i in range(1, n + 1):
+        cost[i][0] = float(i)
+    for j in range(1, m + 1):
+        cost[0][j] = float(j)
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            substitution = 1.0 - _word_similarity(expected[i - 1], heard[j - 1])
+            cost[i][j] = min(
+                cost[i - 1][j] + 1.0,  # слово пропущено
+                cost[i][j - 1] + 1.0,  # лишнее слово
+                cost[i - 1][j - 1] + substitution,
+            )
+
+    matches = [None] * n
+    i, j = n, m
+    while i > 0 and j > 0:
+        substitution = 1.0 - _word_similarity(expected[i - 1], heard[j - 1])
+        if cost[i][j] == cost[i - 1][j - 1] + substitution:
+            matches[i - 1] = j - 1
+            i, j = i - 1, j - 1
+        elif cost[i][j] == cost[i - 1][j] + 1.0:
+            i -= 1
+        else:
+            j -= 1
+    return matches
+
+
+def score_pronunciation(transcript: str, phrase: dict) -> PronunciationResult:
+    """Оценить произношение фразы урока по распознанному тексту (0–100)"""
+    # "втомився/втомилася" — засчитываем любой из вариантов
+    expected_text = spell_numbers(phrase["ukrainian"].split("/")[0])
+    expected_words = normalize_text(expected_text).split()
+    heard_words = normalize_text(spell_numbers(transcript)).split()
+    hints = stress_hints(phrase.get("audio_hint", "").split("/")[0])
+
+    alternatives = {}
+    for variant in phrase["ukrainian"].split("/")[1:]:
+        variant_words = normalize_text(spell_numbers(variant)).split()
+        if variant_words:
+            alternatives[len(expected_words) - 1] = to_phonemes(variant_words[-1])
+
+    expected_phonemes = [to_phonemes(word) for word in expected_words]
+    heard_phonemes = [to_phonemes(word) for word in heard_words]
+    matches = align_words(expected_phonemes, heard_phonemes)
+
+    words = []
+    total, weight = 0.0, 0
+    for idx, word in enumerate(expected_words):
+        match = matches[idx]
+        heard = heard_words[match] if match is not None else None
+        score = 0.0
+        if match is not None:
+            score = _word_similarity(expected_phonemes[idx], heard_phonemes[match])
+            if idx in alternatives:
+                score = max(score, _word_similarity(alternatives[idx], heard_phonemes[match]))
+        words.append(WordScore(word, heard, score, _stress_for(word, hints)))
+        total += score * len(expected_phonemes[idx])
+        weight += len(expected_phonemes[idx])
+
+    return PronunciationResult(round(100 * total / weight) if weight else 0, words)
@@ -0,0 +1,181 @@
+"""
+Планировщик исходящих запросов к AI-провайдерам (OpenAI, Whisper, ElevenLabs).
+
+Для каждого провайдера — лимит одновременных запросов, token bucket на
+частоту запросов и адаптивная пауза после ответов 429. Ожидающие запросы
+выстраиваются по приоритету: ответы пользователю идут раньше фоновой
+работы вроде озвучки, а предзагрузка — после всего остального.
+Одинаковые запросы в полёте склеиваются в один; если к ожидающему
+запросу присоединяется более важный, запрос поднимается в очереди.
+"""
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты: меньше — важнее
+INTERACTIVE = 0
+BACKGROUND = 1
+SPECULATIVE = 2  # Предзагрузка того, что пользователь, возможно, откроет
+
+
+def is_rate_limited(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429
+
+
+def retry_after(error: Exception) -> float:
+    """Значение заголовка Retry-After из ошибки провайдера, если оно есть"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or getattr(error, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class Ticket:
+    """Приоритет запроса и его место в очереди ожидания (для повышения приоритета)"""
+
+    __slots__ = ("priority", "entry")
+
+    def __init__(self, priority: int):
+        self.priority = priority
+        self.entry = None
+
+
+class ProviderLimiter:
+    """Лимиты одного провайдера: слоты с приоритетной очередью, token bucket и пауза после 429"""
+
+    def __init__(self, name: str, concurrency: int, rate: float, burst: int,
+                 min_backoff: float = 1.0, max_backoff: float = 30.0):
+        self.name = name
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self._active = 0
+        self._waiters = []  # куча [priority, seq, future]
+        self._seq = itertools.count()
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._backoff = 0.0
+        self._paused_until = 0.0
+
+    async def acquire(self, ticket: Ticket) -> None:
+        if self._active < self.concurrency and not self._waiters:
+            self._active += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            ticket.entry = [ticket.priority, next(self._seq), future]
+            heapq.heappush(self._waiters, ticket.entry)
+            try:
+                await future
+            except asyncio.CancelledError:
+                # Слот мог быть передан нам одновременно с отменой — возвращаем его
+                if future.done() and not future.cancelled():
+                    self.release()
+                raise
+            finally:
+                ticket.entry = None
+
+        try:
+            await self._wait_for_rate()
+        except asyncio.CancelledError:
+            self.release()
+            raise
+
+    def promote(self, ticket: Ticket, priority: int) -> None:
+        """Поднять приоритет запроса, в том числе уже ждущего в очереди"""
+        if priority >= ticket.priority:
+            return
+        ticket.priority = priority
+        if ticket.entry is not None and not ticket.entry[2].done():
+            ticket.entry[0] = priority
+            heapq.heapify(self._waiters)
+
+    def release(self) -> None:
+        # Слот передаётся напрямую самому приоритетному ожидающему
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    async def _wait_for_rate(self) -> None:
+        while True:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+            self._refilled_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def on_rate_limited(self, delay: float = None) -> None:
+        """Провайдер ответил 429 — притормаживаем все запросы к нему"""
+        self._backoff = min(self.max_backoff, max(self.min_backoff, self._backoff * 2))
+        pause = delay if delay is not None else self._backoff
+        self._paused_until = max(self._paused_until, time.monotonic() + pause)
+        logger.warning(f"{self.name}: rate limited, pausing for {pause:.1f}s")
+
+    def on_success(self) -> None:
+        self._backoff /= 2
+        if self._backoff < self.min_backoff:
+            self._backoff = 0.0
+
+
+class AIScheduler:
+    """Единая точка для всех исходящих запросов к AI"""
+
+    def __init__(self, limits: dict, max_retries: int = 3):
+        self.max_retries = max_retries
+        self._limiters = {name: ProviderLimiter(name, **options) for name, options in limits.items()}
+        self._in_flight = {}  # key → (задача, Ticket)
+
+    async def run(self, provider: str, factory, priority: int = INTERACTIVE, key=None):
+        """Выполнить factory() с учётом лимитов провайдера.
+
+        Запросы с одинаковым key, пока первый из них в полёте, получают его результат.
+        """
+        if key is None:
+            return await self._execute(provider, factory, Ticket(priority))
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is None:
+            ticket = Ticket(priority)
+            task = asyncio.ensure_future(self._execute(provider, factory, ticket))
+            self._in_flight[key] = (task, ticket)
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            # Например, пользователь открыл фразу, озвучка которой ещё ждёт как предзагрузка
+            task, ticket = in_flight
+            self._limiters[provider].promote(ticket, priority)
+        # shield: отмена одного из ожидающих не отменяет общий запрос
+        return await asyncio.shield(task)
+
+    async def _execute(self, provider: str, factory, ticket: Ticket):
+        limiter = self._limiters[provider]
+        attempt = 0
+        while True:
+            await limiter.acquire(ticket)
+            try:
+                result = await factory()
+            except Exception as e:
+                if not is_rate_limited(e) or attempt >= self.max_retries:
+                    raise
+                limiter.on_rate_limited(retry_after(e))
+                attempt += 1
+                continue
+            finally:
+                limiter.release()
+            limiter.on_success()
+            return result
@@ -0,0 +1,134 @@
+"""
+Компактное состояние пользователя.
+
+Вместо словаря из десяти ключей — объект со __slots__: пройденные темы
+хранятся битовой маской по индексам тем, режим и текущая тема — маленькими
+int, а история диалога — очередью, которая создаётся только при первом
+сообщении в диалоге и обрезается по бюджету токенов: старые реплики
+сворачиваются в короткое резюме.
+"""
+import json
+from collections import deque
+
+NO_MODE = -1
+NO_TOPIC = -1
+
+ROLE_USER = 0
+ROLE_ASSISTANT = 1
+ROLES = ("user", "assistant")
+SUMMARY_LABELS = ("Ученик", "Учитель")
+SUMMARY_SEPARATOR = " | "
+
+
+def estimate_tokens(text: str) -> int:
+    """Грубая локальная оценка числа токенов (кириллица ≈ 3 символа на токен)"""
+    return len(text) // 3 + 1
+
+
+class UserSession:
+    """Состояние одного пользователя"""
+
+    __slots__ = (
+        "completed", "current_topic", "phrase_index", "correct_answers",
+        "total_answers", "streak", "last_activity", "mode", "voice", "dialog",
+        "summary",
+    )
+
+    # Бюджеты токенов для истории и резюме (задаются из bot.py)
+    history_tokens = 1200
+    summary_tokens = 200
+
+    def __init__(self, voice: str):
+        self.completed = 0  # битовая маска индексов пройденных тем
+        self.current_topic = NO_TOPIC
+        self.phrase_index = 0
+        self.correct_answers = 0
+        self.total_answers = 0
+        self.streak = 0
+        self.last_activity = 0.0
+        self.mode = NO_MODE
+        self.voice = voice
+        self.dialog = None  # deque[(role, text)] или None, пока диалога не было
+        self.summary = ""  # резюме реплик, вытесненных из истории
+
+    # ---------- Пройденные темы ----------
+
+    def is_completed(self, topic_idx: int) -> bool:
+        return bool(self.completed >> topic_idx & 1)
+
+    def mark_completed(self, topic_idx: int) -> None:
+        self.completed |= 1 << topic_idx
+
+    def completed_indices(self) -> list:
+        return [i for i in range(self.completed.bit_length()) if self.completed >> i & 1]
+
+    # ---------- История диалога ----------
+
+    def add_dialog_message(self, role: int, text: str) -> None:
+        if self.dialog is None:
+            self.dialog = deque()
+        self.dialog.append((role, text))
+        self._trim_dialog()
+
+    def clear_dialog(self) -> None:
+        self.dialog = None
+        self.summary = ""
+
+    def _trim_dialog(self) -> None:
+        """Вытеснить старые реплики в резюме, пока история не влезет в бюджет"""
+        total = sum(estimate_tokens(text) for _, text in self.dialog)
+        # Последнюю реплику оставляем всегда, даже если она длиннее бюджета
+        while total > self.history_tokens and len(self.dialog) > 1:
+            role, text = self.dialog.popleft()
+            total -= estimate_tokens(text)
+            self._fold_into_summary(role, text)
+
+    def _fold_into_summary(self, role: int, text: str) -> None:
+        snippet = " ".join(text.split())
+        if len(snippet) > 80:
+            snippet = snippet[:77] + "..."
+        entry = f"{SUMMARY_LABELS[role]}: {snippet}"
+        self.summary = f"{self.summary}{SUMMARY_SEPARATOR}{entry}" if self.summary else entry
+
+        # Резюме тоже ограничено — отбрасываем самые старые записи
+        while estimate_tokens(self.summary) > self.summary_tokens and SUMMARY_SEPARATOR in self.summary:
+            self.summary = self.summary.split(SUMMARY_SEPARATOR, 1)[1]
+
+    def dialog_messages(self) -> list:
+        """История в формате сообщений OpenAI"""
+        if not self.dialog:
+            return []
+        return [{"role": ROLES[role], "content": text} for role, text in self.dialog]
+
+    # ---------- Сериализация ----------
+
+    def to_json(self) -> str:
+        return json.dumps(
+            [
+                self.completed, self.current_topic, self.phrase_index,
+                self.correct_answers, self.total_answers, self.streak,
+                self.last_activity, self.mode, self.voice,
+                list(self.dialog) if self.dialog else [],
+                self.summary,
+            ],
+            ensure_ascii=False, separators=(",", ":")
+        )
+
+    @classmethod
+    def from_json(cls, raw: str) -> "UserSession":
+        data = json.loads(raw)
+        (completed, current_topic, phrase_index, correct_answers, total_answers,
+         streak, last_activity, mode, voice, dialog) = data[:10]
+        session = cls(voice)
+        session.completed = completed
+        session.current_topic = current_topic
+        session.phrase_index = phrase_index
+        session.correct_answers = correct_answers
+        session.total_answers = total_answers
+        session.streak = streak
+        session.last_activity = last_activity
+        session.mode = mode
+        if dialog:
+            session.dialog = deque((role, text) for role, text in dialog)
+        session.summary = data[10] if len(data) > 10 else ""
+        return session
@@ -0,0 +1,178 @@
+"""
+Хранилище состояния пользователей: прогресс переживает перезапуски,
+а в памяти остаются только активные пользователи.
+
+UserStore — write-back кэш поверх StorageBackend: изменения копятся в памяти
+и пишутся пачками раз в flush_interval, неактивные пользователи вытесняются
+по TTL. Бэкенд по умолчанию — SQLite; MemoryBackend повторяет интерфейс
+внешнего key-value хранилища (например, Redis) и годится для локального запуска.
+"""
+import time
+import asyncio
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class StorageBackend:
+    """Интерфейс хранилища: user_id → сериализованное состояние (str)"""
+
+    def load(self, user_id: int) -> str:
+        raise NotImplementedError
+
+    def save_many(self, items: dict) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryBackend(StorageBackend):
+    """Хранилище в памяти процесса — заменитель внешнего key-value сервиса"""
+
+    def __init__(self):
+        self._items = {}
+
+    def load(self, user_id: int) -> str:
+        return self._items.get(user_id)
+
+    def save_many(self, items: dict) -> None:
+        self._items.update(items)
+
+
+class SQLiteBackend(StorageBackend):
+    """Хранилище в SQLite-файле"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS users ("
+            "user_id INTEGER PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def load(self, user_id: int) -> str:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM users WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def save_many(self, items: dict) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO users (user_id, data, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                [(user_id, data, now) for user_id, data in items.items()]
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class UserStore:
+    """Write-back кэш состояния пользователей с TTL-вытеснением и пакетной записью"""
+
+    def __init__(self, backend: StorageBackend, factory, serialize, deserialize, ttl: float = 3600,
+                 max_items: int = 10000, flush_interval: float = 5, active_window: float = 300):
+        self.backend = backend
+        self.factory = factory
+        self.serialize = serialize
+        self.deserialize = deserialize
+        self.ttl = ttl
+        self.max_items = max_items
+        self.flush_interval = flush_interval
+        # Хендлер может менять состояние после get() (например, после ответа GPT),
+        # поэтому при записи проверяем всех, к кому обращались в этом окне
+        self.active_window = active_window
+        self._cache = OrderedDict()  # user_id → [state, last_access]
+        self._written = {}  # user_id → последняя записанная сериализация
+        self._task = None
+
+    def get(self, user_id: int):
+        """Получить изменяемое состояние пользователя"""
+        entry = self._cache.get(user_id)
+        if entry is None:
+            raw = self.backend.load(user_id)
+            if raw is not None:
+                state = self.deserialize(raw)
+                self._written[user_id] = raw
+            else:
+                state = self.factory()
+            entry = [state, 0.0]
+            self._cache[user_id] = entry
+        entry[1] = time.monotonic()
+        self._cache.move_to_end(user_id)
+        return entry[0]
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def _collect_changes(self, since: float) -> dict:
+        changes = {}
+        for user_id, (state, last_access) in self._cache.items():
+            if last_access < since:
+                continue
+            raw = self.serialize(state)
+            if self._written.get(user_id) != raw:
+                changes[user_id] = raw
+        return changes
+
+    async def flush(self, everything: bool = False) -> None:
+        """Записать изменённые состояния одной пачкой"""
+        since = 0.0 if everything else time.monotonic() - self.active_window
+        # Сериализуем в event loop, чтобы не читать состояние, которое меняют хендлеры
+        changes = self._collect_changes(since)
+        if not changes:
+            return
+        try:
+            await asyncio.to_thread(self.backend.save_many, changes)
+        except Exception as e:
+            logger.error(f"User store flush error: {e}")
+            return
+        self._written.update(changes)
+
+    def evict_idle(self) -> None:
+        """Вытеснить неактивных пользователей, состояние которых уже записано"""
+        deadline = time.monotonic() - self.ttl
+        overflow = len(self._cache) - self.max_items
+        for user_id in list(self._cache):
+            state, last_access = self._cache[user_id]
+            if last_access >= deadline and overflow <= 0:
+                break
+            if self._written.get(user_id) != self.serialize(state):
+                continue
+            del self._cache[user_id]
+            self._written.pop(user_id, None)
+            overflow -= 1
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+            self.evict_idle()
+
+    def start(self) -> None:
+        """Запустить фоновую запись (внутри работающего event loop)"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановить фоновую запись и сохранить всё"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush(everything=True)
+        self.backend.close()
@@ -0,0 +1,148 @@
+"""
+Распознавание речи с подключаемыми бэкендами.
+
+WhisperAPIBackend — OpenAI whisper-1 (по умолчанию).
+LocalWhisperBackend — faster-whisper на CPU: модель грузится один раз,
+распознавание идёт в пуле потоков, без сетевого запроса.
+STTRouter отправляет короткие фразы в локальный бэкенд, остальное — в API.
+"""
+import io
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from scheduler import INTERACTIVE
+
+logger = logging.getLogger(__name__)
+
+
+class STTBackend:
+    """Интерфейс бэкенда распознавания: audio — байты OGG или путь к файлу"""
+
+    name = "base"
+
+    async def transcribe(self, audio) -> str:
+        raise NotImplementedError
+
+    async def warm_up(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class WhisperAPIBackend(STTBackend):
+    """OpenAI Whisper API через общий планировщик запросов"""
+
+    name = "whisper-api"
+
+    def __init__(self, client, scheduler, model: str = "whisper-1", language: str = "uk"):
+        self.client = client
+        self.scheduler = scheduler
+        self.model = model
+        self.language = language
+
+    async def transcribe(self, audio) -> str:
+        async def request():
+            if isinstance(audio, (bytes, bytearray)):
+                return await self.client.audio.transcriptions.create(
+                    model=self.model,
+                    file=("voice.ogg", bytes(audio)),
+                    language=self.language
+                )
+            with open(audio, "rb") as audio_file:
+                return await self.client.audio.transcriptions.create(
+                    model=self.model,
+                    file=audio_file,
+                    language=self.language
+                )
+
+        transcript = await self.scheduler.run("whisper", request, priority=INTERACTIVE)
+        return transcript.text
+
+
+class LocalWhisperBackend(STTBackend):
+    """Локальный faster-whisper (квантованная модель на CPU)"""
+
+    name = "faster-whisper"
+
+    def __init__(self, model_size: str = "small", compute_type: str = "int8",
+                 workers: int = 2, cpu_threads: int = 2, language: str = "uk"):
+        # Импорт здесь, чтобы без faster-whisper бот работал только с API
+        from faster_whisper import WhisperModel  # noqa: F401
+
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.workers = workers
+        self.cpu_threads = cpu_threads
+        self.language = language
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stt")
+
+    def _get_model(self):
+        with self._load_lock:
+            if self._model is None:
+                from faster_whisper import WhisperModel
+                logger.info(f"Loading local STT model '{self.model_size}' ({self.compute_type})")
+                self._model = WhisperModel(
+                    self.model_size,
+                    device="cpu",
+                    compute_type=self.compute_type,
+                    cpu_threads=self.cpu_threads,
+                    num_workers=self.workers
+                )
+            return self._model
+
+    def _transcribe_sync(self, audio) -> str:
+        source = io.BytesIO(bytes(audio)) if isinstance(audio, (bytes, bytearray)) else audio
+        segments, _ = self._get_model().transcribe(
+            source, language=self.language, beam_size=1, vad_filter=True
+        )
+        return " ".join(segment.text.strip() for segment in segments).strip()
+
+    async def transcribe(self, audio) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._transcribe_sync, audio)
+
+    async def warm_up(self) -> None:
+        """Загрузить модель заранее, чтобы первый пользователь не ждал"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._get_model)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class STTRouter:
+    """Выбор бэкенда по длительности: короткие фразы — локально, остальное — API"""
+
+    def __init__(self, remote: STTBackend, local: STTBackend = None, max_local_duration: float = 10):
+        self.remote = remote
+        self.local = local
+        self.max_local_duration = max_local_duration
+
+    async def transcribe(self, audio, duration: float = None) -> str:
+        if self.local is not None and duration is not None and duration <= self.max_local_duration:
+            try:
+                text = await self.local.transcribe(audio)
+                if text:
+                    return text
+            except Exception as e:
+                logger.error(f"Local STT error, falling back to {self.remote.name}: {e}")
+        return await self.remote.transcribe(audio)
+
+    async def warm_up(self) -> None:
+        if self.local is not None:
+            try:
+                await self.local.warm_up()
+            except Exception as e:
+                logger.error(f"Local STT warm-up failed, using {self.remote.name} only: {e}")
+                self.local.close()
+                self.local = None
+
+    def close(self) -> None:
+        for backend in (self.local, self.remote):
+            if backend is not None:
+                backend.close()
@@ -0,0 +1,33 @@
+import pytest
+
+from answer_cache import AnswerCache
+
+
+@pytest.fixture
+def cache():
+    return AnswerCache(max_items=10, ttl=3600, threshold=0.85)
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("Чем отличается і от ї?", "Чем отличается і от и?"),
+    ("Как будет кот по-украински?", "Как будет кит по-украински?"),
+    ("Какая разница между е и є?", "Какая разница между и и і?"),
+    ("Как сказать я устал?", "Как сказать я устала?"),
+])
+def test_different_subject_is_a_miss(cache, cached, asked):
+    cache.put(cached, "answer")
+    assert cache.get(asked) is None
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("Как будет кот по-украински?", "как будет кот по украински"),
+    ("Скажи, как будет кот по-украински?", "Как будет кот по-украински?"),
+    ("Чем отличается і от и?", "Чем отличается і от и"),
+])
+def test_same_question_is_a_hit(cache, cached, asked):
+    cache.put(cached, "answer")
+    assert cache.get(asked) == "answer"
+
+
+def test_please_is_kept(cache):
+    assert "пожалуйста" in cache.normalize("Как будет пожалуйста?")
@@ -0,0 +1,28 @@
+import pytest
+
+from feedback_bank import FeedbackBank
+
+HOW_ARE_YOU = {"russian": "Привет, как твои дела?", "ukrainian": "Привіт, як твої справи?"}
+
+
+@pytest.fixture
+def bank(tmp_path):
+    bank = FeedbackBank(str(tmp_path / "feedback_bank.json"))
+    bank.add(HOW_ARE_YOU, "Привіт, як твої справи?", "Верно, «справи» — дела.", True)
+    bank.add(HOW_ARE_YOU, "Привіт, як твої дела?", "«Дела» по-украински — «справи».", False)
+    return bank
+
+
+def test_exact_correct_answer_reuses_verdict(bank):
+    assert bank.lookup(HOW_ARE_YOU, "привіт як твої справи") == ("Верно, «справи» — дела.", True)
+
+
+@pytest.mark.parametrize("answer", ["Привіт, як твої справа?", "Привіт, як твої справі?"])
+def test_changed_ending_is_not_counted_correct(bank, answer):
+    assert bank.lookup(HOW_ARE_YOU, answer) is None
+    # Другая ошибка — для неё в банке появится свой кластер
+    assert bank.add(HOW_ARE_YOU, answer, "Окончание: «справи».", False)
+
+
+def test_mistake_clusters_match_fuzzily(bank):
+    assert bank.lookup(HOW_ARE_YOU, "Привіт, як твої делла?") == ("«Дела» по-украински — «справи».", False)
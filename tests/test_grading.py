@@ -0,0 +1,56 @@
+import pytest
+
+from grading import grade_translation, EXACT, NEAR, AMBIGUOUS
+
+COFFEE = {"russian": "Я хочу кофе", "ukrainian": "Я хочу каву", "hint": "кава = кофе (ж.р.)"}
+LIKE = {"russian": "Мне нравится", "ukrainian": "Мені подобається", "hint": "подобається = нравится"}
+WONDERFUL = {"russian": "Это чудесно!", "ukrainian": "Це чудово!", "hint": "чудово = чудесно"}
+HOME = {"russian": "Я дома", "ukrainian": "Я вдома", "hint": "вдома = дома (с приставкой в)"}
+TIRED = {"russian": "Я устал", "ukrainian": "Я втомився", "alternatives": ["Я втомилася"]}
+PRICE = {"russian": "Сколько это стоит?", "ukrainian": "Скільки це коштує?", "hint": "коштує = стоит"}
+PLEASE = {"russian": "Пожалуйста", "ukrainian": "Будь ласка", "hint": "буквально 'будь ласков'"}
+MORNING = {"russian": "Доброе утро!", "ukrainian": "Добрий ранок!", "hint": "ранок = утро"}
+
+
+@pytest.mark.parametrize("answer, exercise", [
+    ("я хочу каву", COFFEE),
+    ("Мені  подобається!", LIKE),
+    ("Я втомилася", TIRED),
+])
+def test_exact(answer, exercise):
+    grade = grade_translation(answer, exercise)
+    assert grade.verdict == EXACT and grade.is_correct
+
+
+@pytest.mark.parametrize("answer, exercise", [
+    ("Скільки це кохтує?", PRICE),
+    ("Добрий рвнок!", MORNING),
+])
+def test_typo_inside_word_is_near(answer, exercise):
+    grade = grade_translation(answer, exercise)
+    assert grade.verdict == NEAR and grade.is_correct
+
+
+@pytest.mark.parametrize("answer, exercise", [
+    ("Я хочу кава", COFFEE),  # падеж
+    ("Мене подобається", LIKE),  # мене/мені
+    ("Це чудова", WONDERFUL),  # окончание наречия
+    ("Я втомилось", TIRED),
+])
+def test_changed_ending_is_not_a_typo(answer, exercise):
+    grade = grade_translation(answer, exercise)
+    assert grade.verdict == AMBIGUOUS and not grade.is_correct
+
+
+def test_russian_word_is_not_a_typo():
+    grade = grade_translation("Я дома", HOME)
+    assert grade.verdict != NEAR and not grade.is_correct
+
+
+@pytest.mark.parametrize("answer, exercise", [
+    ("Прошу", PLEASE),  # синоним, на эталон не похож
+    ("Добрий ранок", COFFEE),
+])
+def test_dissimilar_answer_goes_to_llm(answer, exercise):
+    grade = grade_translation(answer, exercise)
+    assert grade.verdict == AMBIGUOUS and not grade.is_correct
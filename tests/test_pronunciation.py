@@ -0,0 +1,36 @@
+import pytest
+
+from pronunciation import number_to_words, score_pronunciation
+
+BUS = {
+    "ukrainian": "Це автобус номер 5?",
+    "russian": "Это автобус номер 5?",
+    "audio_hint": "це ав-то-БУС НО-мер п'ять?",
+}
+
+
+@pytest.mark.parametrize("number, words", [
+    (0, "нуль"),
+    (5, "п'ять"),
+    (12, "дванадцять"),
+    (41, "сорок один"),
+    (200, "двісті"),
+    (1000, "тисяча"),
+    (21000, "двадцять одна тисяча"),
+    (2024, "дві тисячі двадцять чотири"),
+    (11000, "одинадцять тисяч"),
+])
+def test_number_to_words(number, words):
+    assert number_to_words(number) == words
+
+
+@pytest.mark.parametrize("transcript", ["Це автобус номер п'ять?", "Це автобус номер 5?", "це автобус номер пʼять"])
+def test_digits_match_spelled_numbers(transcript):
+    result = score_pronunciation(transcript, BUS)
+    assert result.score == 100
+    assert [word.expected for word in result.words] == ["це", "автобус", "номер", "п'ять"]
+
+
+def test_wrong_number_is_not_accepted():
+    result = score_pronunciation("Це автобус номер шість", BUS)
+    assert result.words[-1].score < 0.85
@@ -0,0 +1,51 @@
+import asyncio
+
+from scheduler import AIScheduler, INTERACTIVE, BACKGROUND, SPECULATIVE
+
+LIMITS = {"tts": {"concurrency": 1, "rate": 1000, "burst": 1000}}
+
+
+def run_in_order(requests: list, joins: list = ()) -> list:
+    """Занять единственный слот, поставить requests [(имя, приоритет)] в очередь и вернуть порядок выполнения"""
+    async def scenario() -> list:
+        scheduler = AIScheduler(LIMITS)
+        order = []
+        release = asyncio.Event()
+
+        async def blocker():
+            await release.wait()
+
+        def request(name):
+            async def factory():
+                order.append(name)
+                return name
+            return factory
+
+        tasks = [asyncio.ensure_future(scheduler.run("tts", blocker))]
+        await asyncio.sleep(0)
+        for name, priority in requests:
+            tasks.append(asyncio.ensure_future(scheduler.run("tts", request(name), priority=priority, key=name)))
+        await asyncio.sleep(0)
+        for name, priority in joins:
+            tasks.append(asyncio.ensure_future(scheduler.run("tts", request("duplicate"), priority=priority, key=name)))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*tasks)
+        return order
+
+    return asyncio.run(scenario())
+
+
+def test_priority_levels():
+    order = run_in_order([("prefetch", SPECULATIVE), ("prerender", BACKGROUND), ("reply", INTERACTIVE)])
+    assert order == ["reply", "prerender", "prefetch"]
+
+
+def test_joining_request_promotes_waiting_one():
+    order = run_in_order([("prerender", BACKGROUND), ("prefetch", SPECULATIVE)], joins=[("prefetch", INTERACTIVE)])
+    assert order == ["prefetch", "prerender"]
+
+
+def test_joining_request_does_not_demote():
+    order = run_in_order([("reply", INTERACTIVE), ("prerender", BACKGROUND)], joins=[("reply", SPECULATIVE)])
+    assert order == ["reply", "prerender"]
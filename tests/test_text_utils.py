@@ -0,0 +1,26 @@
+import pytest
+
+from text_utils import looks_ukrainian
+
+
+@pytest.mark.parametrize("text", [
+    "Привіт! Як справи?",
+    "Ти добре написав!",
+    "Дякую!",
+    "Це автобус номер 5?",
+    "Добрий ранок",
+])
+def test_ukrainian(text):
+    assert looks_ukrainian(text)
+
+
+@pytest.mark.parametrize("text", [
+    "Правильно говорить так: я вдома.",  # без ы/э/ё/ъ, но по-русски
+    "Привет! Как дела?",
+    "Молодец, всё верно",
+    "Попробуй ещё раз",
+    "Так",  # одинаково в обоих языках — не озвучиваем
+    "🙂 5",
+])
+def test_not_ukrainian(text):
+    assert not looks_ukrainian(text)
@@ -0,0 +1,60 @@
+import asyncio
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from update_processor import PerUserUpdateProcessor
+
+
+def make_update(update_id: int, user_id: int) -> Update:
+    return Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": 0, "text": str(update_id),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "test"},
+        },
+    }, None)
+
+
+def run(updates: list, limit: int) -> tuple:
+    """Прогнать апдейты через process_update, как Application; вернуть (порядок, максимум одновременных)"""
+    async def scenario():
+        processor = PerUserUpdateProcessor(limit)
+        order, active, peak = [], 0, 0
+
+        async def handler(update):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            order.append((update.effective_user.id, update.update_id))
+            active -= 1
+
+        await asyncio.gather(*(processor.process_update(update, handler(update)) for update in updates))
+        return order, peak
+
+    return asyncio.run(scenario())
+
+
+def test_process_update_is_not_overridden():
+    # Всё поведение — в do_process_update; process_update остаётся методом PTB
+    assert PerUserUpdateProcessor.process_update is BaseUpdateProcessor.process_update
+
+
+def test_one_user_in_order_and_limit_respected():
+    updates = [make_update(i, user_id=1 + i % 3) for i in range(12)]
+    order, peak = run(updates, limit=2)
+    for user_id in (1, 2, 3):
+        ids = [update_id for user, update_id in order if user == user_id]
+        assert ids == sorted(ids)
+    assert peak <= 2
+
+
+def test_burst_from_one_user_does_not_block_others():
+    burst = [make_update(i, user_id=1) for i in range(10)]
+    others = [make_update(100 + i, user_id=2 + i) for i in range(3)]
+    order, _ = run(burst + others, limit=2)
+    # Остальные пользователи обслужены раньше, чем закончилась пачка первого
+    last_other = max(order.index((2 + i, 100 + i)) for i in range(3))
+    assert last_other < order.index((1, 9))
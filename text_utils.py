@@ -0,0 +1,117 @@
+"""
+Локальная обработка текста: нормализация и нечёткое сравнение строк
+без обращения к API.
+"""
+import re
+import math
+import unicodedata
+from collections import Counter
+
+# Все варианты апострофа приводим к обычному '
+APOSTROPHES = "’ʼ‘`´′"
+_APOSTROPHE_TABLE = str.maketrans({ch: "'" for ch in APOSTROPHES})
+_PUNCTUATION_RE = re.compile(r"[^\w\s']+")
+_SPACES_RE = re.compile(r"\s+")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?…])\s+")
+
+# Буквы, которые есть только в одном из языков
+UKRAINIAN_ONLY_LETTERS = set("іїєґ")
+RUSSIAN_ONLY_LETTERS = set("ыэёъ")
+# Частые украинские слова без і/ї/є/ґ, которых нет в русском
+UKRAINIAN_WORDS = {
+    "що", "щоб", "як", "це", "цей", "ця", "ти", "ви", "ми", "вона", "вони", "воно", "його",
+    "але", "або", "чи", "бо", "дуже", "теж", "також", "вже", "ще", "трохи", "багато",
+    "коли", "де", "куди", "хто", "чому", "який", "яка", "яке", "мене", "мені", "тобі",
+    "добре", "добрий", "дякую", "ласка", "справи", "звуть", "чудово", "гарно", "гаразд",
+    "звичайно", "вчора", "вдома", "треба", "можу", "буде", "будемо", "був", "була",
+    "ранок", "кава", "каву", "смачного",
+}
+# Частые русские слова из пояснений, которых нет в украинском
+RUSSIAN_WORDS = {
+    "это", "как", "что", "чтобы", "если", "или", "нет", "да", "когда", "только", "тоже",
+    "очень", "здесь", "сейчас", "потому", "нужно", "надо", "говорить", "говорят", "пишется",
+    "слово", "значит", "означает", "переводится", "вместо", "хорошо", "отлично", "молодец",
+    "попробуй", "обрати", "внимание", "ошибка", "ошибку", "русски", "украински",
+    "русском", "украинском",
+}
+
+
+def normalize_text(text: str) -> str:
+    """Нижний регистр, единый апостроф, без пунктуации и лишних пробелов"""
+    text = unicodedata.normalize("NFC", text).lower().translate(_APOSTROPHE_TABLE)
+    text = _PUNCTUATION_RE.sub(" ", text)
+    return _SPACES_RE.sub(" ", text).strip()
+
+
+def split_sentences(text: str, max_chars: int) -> list:
+    """Разбить текст на куски не длиннее max_chars по границам предложений.
+
+    Предложение длиннее max_chars остаётся отдельным куском целиком.
+    """
+    chunks, current = [], ""
+    for sentence in _SENTENCE_END_RE.split(text.strip()):
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def looks_ukrainian(text: str) -> bool:
+    """Похож ли текст на украинский, а не на русское пояснение.
+
+    Нужен положительный признак: украинская буква (і, ї, є, ґ) или частое
+    украинское слово. Отсутствия русских букв мало: «Правильно говорить
+    так: я вдома.» написано без ы/э/ё/ъ, но это пояснение на русском.
+    """
+    normalized = normalize_text(text)
+    letters = set(normalized)
+    if letters & RUSSIAN_ONLY_LETTERS:
+        return False
+    words = normalized.split()
+    if any(word in RUSSIAN_WORDS for word in words):
+        return False
+    return bool(letters & UKRAINIAN_ONLY_LETTERS) or any(word in UKRAINIAN_WORDS for word in words)
+
+
+def char_ngrams(text: str, n: int = 3) -> Counter:
+    """Символьные n-граммы нормализованного текста (с границами слов)"""
+    padded = f" {text} "
+    return Counter(padded[i:i + n] for i in range(max(len(padded) - n + 1, 1)))
+
+
+def cosine_similarity(a: Counter, b: Counter) -> float:
+    """Косинусная близость двух векторов n-грамм"""
+    if not a or not b:
+        return 0.0
+    dot = sum(count * b[gram] for gram, count in a.items() if gram in b)
+    norm = math.sqrt(sum(c * c for c in a.values())) * math.sqrt(sum(c * c for c in b.values()))
+    return dot / norm if norm else 0.0
+
+
+def levenshtein(a: str, b: str) -> int:
+    """Расстояние Левенштейна (вставка, удаление, замена)"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ch_a in enumerate(a, 1):
+        current = [i]
+        for j, ch_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ch_a != ch_b),
+            ))
+        previous = current
+    return previous[-1]
+
+
+def levenshtein_ratio(a: str, b: str) -> float:
+    """Похожесть строк от 0 до 1 на основе расстояния Левенштейна"""
+    longest = max(len(a), len(b))
+    if not longest:
+        return 1.0
+    return 1.0 - levenshtein(a, b) / longest
@@ -0,0 +1,58 @@
+"""
+Параллельная обработка апдейтов с очередью на каждого пользователя.
+
+Апдейты одного пользователя выполняются строго по очереди, чтобы
+ConversationHandler видел их в том порядке, в котором они пришли. Общий
+лимит параллельности берётся только после очереди пользователя: один
+пользователь, приславший много сообщений подряд, держит не больше одного
+слота и не задерживает остальных.
+
+BaseUpdateProcessor.process_update помечен в PTB как @final и держит свой
+семафор до вызова do_process_update, то есть до очереди пользователя.
+Поэтому семафор базового класса создаётся неограничивающим, а общий лимит
+и очередь пользователя целиком живут в do_process_update — только
+публичный API, без переопределения process_update.
+"""
+import asyncio
+import weakref
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+# Граница семафора базового класса: фактически без ограничения
+UNBOUNDED = 2 ** 31 - 1
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Параллельная обработка апдейтов разных пользователей, по порядку — одного"""
+
+    def __init__(self, max_concurrent_updates: int):
+        if max_concurrent_updates < 1:
+            raise ValueError("max_concurrent_updates must be a positive integer")
+        super().__init__(UNBOUNDED)
+        # Настоящий лимит; max_concurrent_updates базового класса — UNBOUNDED
+        self.limit = max_concurrent_updates
+        self._slots = asyncio.BoundedSemaphore(max_concurrent_updates)
+        self._user_locks = weakref.WeakValueDictionary()
+
+    async def do_process_update(self, update: object, coroutine) -> None:
+        user = update.effective_user if isinstance(update, Update) else None
+        if user is None:
+            async with self._slots:
+                await coroutine
+            return
+
+        lock = self._user_locks.get(user.id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._user_locks[user.id] = lock
+        # asyncio.Lock отдаёт захват в порядке ожидания — порядок апдейтов сохраняется
+        async with lock:
+            async with self._slots:
+                await coroutine
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
@@ -0,0 +1,85 @@
+"""
+Фоновая отправка озвучки.
+
+Обработчик отправляет текст и сразу возвращается, а голосовое догоняет его
+из фоновой задачи — следующее нажатие пользователя не ждёт синтеза речи.
+У каждого чата не больше одной задачи: новая (например, после «Далее ➡️»)
+отменяет предыдущую. Очередь ограничена: если она заполнена, озвучка
+пропускается, а не копится.
+"""
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class VoiceJob:
+    __slots__ = ("chat_id", "factory", "cancelled", "task")
+
+    def __init__(self, chat_id: int, factory):
+        self.chat_id = chat_id
+        self.factory = factory
+        self.cancelled = False
+        self.task = None
+
+
+class VoiceDelivery:
+    """Ограниченная очередь фоновых задач озвучки, не больше одной на чат"""
+
+    def __init__(self, workers: int = 8, max_queued: int = 100):
+        self.workers = workers
+        self._queue = asyncio.Queue(max_queued)
+        self._jobs = {}  # chat_id → последняя задача чата
+        self._worker_tasks = []
+        self.dropped = 0
+
+    def start(self) -> None:
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    def submit(self, chat_id: int, factory) -> bool:
+        """Поставить factory() в очередь вместо прежней задачи чата. False — очередь заполнена"""
+        self.cancel(chat_id)
+        job = VoiceJob(chat_id, factory)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"Voice queue is full, dropping voice for chat {chat_id}")
+            return False
+        self._jobs[chat_id] = job
+        return True
+
+    def cancel(self, chat_id: int) -> None:
+        """Пользователь ушёл со страницы — озвучка ему больше не нужна"""
+        job = self._jobs.pop(chat_id, None)
+        if job is None:
+            return
+        job.cancelled = True
+        if job.task is not None:
+            job.task.cancel()
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.cancelled:
+                    continue
+                job.task = asyncio.create_task(job.factory())
+                try:
+                    await job.task
+                except asyncio.CancelledError:
+                    # Отменили задачу, а не воркер — продолжаем работу
+                    if not job.cancelled:
+                        raise
+                except Exception as e:
+                    logger.error(f"Voice delivery error for chat {job.chat_id}: {e}")
+            finally:
+                if self._jobs.get(job.chat_id) is job:
+                    del self._jobs[job.chat_id]
+                self._queue.task_done()
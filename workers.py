@@ -0,0 +1,90 @@
+"""
+Горизонтальное масштабирование: несколько процессов-обработчиков.
+
+Диспетчер получает апдейты (polling или вебхук) и раскладывает их по
+процессам по user_id: все апдейты одного пользователя попадают в один
+процесс и обрабатываются по порядку, поэтому состояние его диалога
+может жить в памяти этого процесса. Прогресс пользователей — в общем
+хранилище (локально — SQLite в режиме WAL).
+"""
+import queue
+import signal
+import asyncio
+import logging
+import multiprocessing
+
+from telegram import Update
+
+logger = logging.getLogger(__name__)
+
+# Сигнал процессу-обработчику завершиться после уже полученных апдейтов
+STOP = None
+
+
+def shard_for(update: Update, count: int) -> int:
+    """Номер процесса для апдейта: один пользователь — всегда один процесс"""
+    user = update.effective_user
+    if user is not None:
+        return user.id % count
+    chat = update.effective_chat
+    return chat.id % count if chat is not None else 0
+
+
+class WorkerPool:
+    """Процессы-обработчики и их очереди апдейтов"""
+
+    def __init__(self, count: int, target, queue_size: int = 1000):
+        # spawn: каждый процесс импортирует бота заново, без унаследованных соединений и event loop
+        context = multiprocessing.get_context("spawn")
+        self.queues = [context.Queue(queue_size) for _ in range(count)]
+        self.processes = [
+            context.Process(target=target, args=(index, self.queues[index]), name=f"bot-worker-{index}")
+            for index in range(count)
+        ]
+
+    def start(self) -> None:
+        for process in self.processes:
+            process.start()
+        logger.info(f"Started {len(self.processes)} bot workers")
+
+    async def forward(self, update: Update, context) -> None:
+        """Обработчик диспетчера: передать апдейт процессу, отвечающему за пользователя"""
+        updates_queue = self.queues[shard_for(update, len(self.queues))]
+        data = update.to_dict()
+        try:
+            updates_queue.put_nowait(data)
+        except queue.Full:
+            # Процесс не успевает — диспетчер ждёт, порядок апдейтов сохраняется
+            await asyncio.to_thread(updates_queue.put, data)
+
+    async def stop(self, timeout: float = 30) -> None:
+        for updates_queue in self.queues:
+            await asyncio.to_thread(updates_queue.put, STOP)
+        for process in self.processes:
+            await asyncio.to_thread(process.join, timeout)
+            if process.is_alive():
+                logger.warning(f"{process.name} did not stop in {timeout}s, terminating")
+                process.terminate()
+
+
+async def run_worker(application, updates_queue) -> None:
+    """Цикл процесса-обработчика: апдейты из очереди диспетчера в update_queue приложения"""
+    # Остановкой управляет диспетчер через STOP — Ctrl+C и SIGTERM группе процессов не прерывают обработку
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    async with application:
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        try:
+            while True:
+                data = await asyncio.to_thread(updates_queue.get)
+                if data is STOP:
+                    break
+                await application.update_queue.put(Update.de_json(data, application.bot))
+        finally:
+            # stop() дорабатывает апдейты, уже переданные приложению
+            await application.stop()
+    if application.post_shutdown:
+        await application.post_shutdown(application)